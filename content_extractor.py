@@ -1,9 +1,8 @@
 import google.generativeai as genai
-from langchain_community.document_loaders import PyPDFLoader
 import json
 import re
 import os
-import pdfplumber
+from pdf_backends import extract_text
 
 # Configure Gemini with your API key
 genai.configure(api_key="api-key-here")
@@ -12,16 +11,12 @@ genai.configure(api_key="api-key-here")
 model = genai.GenerativeModel('models/gemini-2.0-flash')
 
 # Function to read and combine PDF pages into a single string
-def read_pdf(file_path):
-    loader = PyPDFLoader(file_path)
-    pages = loader.load_and_split()
-    full_text = "\n".join([page.page_content for page in pages])
-    return full_text
+# (backend chosen per language by `python pdf_backends.py benchmark`, text cached by file hash)
+def read_pdf(file_path, backend=None):
+    return extract_text(file_path, "Fr", backend)
 
-def read_pdf_arabic(file_path):
-    with pdfplumber.open(file_path) as pdf:
-        full_text = "\n".join([page.extract_text() or "" for page in pdf.pages])
-    return full_text
+def read_pdf_arabic(file_path, backend=None):
+    return extract_text(file_path, "Ar", backend)
 
 # Function to ask Gemini to extract specific fields in structured JSON format
 def extract_key_fields(pdf_text):
@@ -121,7 +116,7 @@ def preprocess_pdf_forms(language):
 
             while attempt < max_retries and not success:
                 try:
-                    pdf_text = read_pdf(file_path)
+                    pdf_text = read_pdf(file_path) if language == "Fr" else read_pdf_arabic(file_path)
                     extracted_info = extract_key_fields(pdf_text) if language == "Fr" else extract_key_fields_arabic(pdf_text)
 
                     if extracted_info:
@@ -1,20 +1,151 @@
-import json
-import pandas as pd
-
-# 1) Load the JSON data from ./scraped_data.json
-with open("scraped_data.json", "r", encoding="utf-8") as f:
-    data = json.load(f)
-
-# 2) If "pdf_local_paths" is a list, convert it into a semicolon-separated string
-for entry in data:
-    if isinstance(entry.get("pdf_local_paths"), list):
-        entry["pdf_local_paths"] = ";".join(entry["pdf_local_paths"])
-
-# 3) Create a DataFrame from the list of dicts
-df = pd.DataFrame(data)
-
-# 4) Write to Excel
-#    You can install openpyxl (or xlsxwriter) if it isn’t already: pip install openpyxl
-df.to_excel("scraped_data.xlsx", index=False, engine="openpyxl")
-
-print("Converted scraped_data.json → scraped_data.xlsx")
+"""
+Export scraped_data.json to XLSX, CSV or Parquet in constant memory.
+
+Entries are read one at a time from the JSON array and written straight to
+the output, so memory stays flat whatever the size of the file. Each export
+has two tables:
+  - procedures : one row per entry (code, type_ent, genre_ent, ...)
+  - documents  : one row per line of json_contents
+                 (code, content_index, language, field, position, text)
+
+    python convert_excel.py                                  # → scraped_data.xlsx
+    python convert_excel.py --format csv --output export/scraped_data
+    python convert_excel.py --format parquet --output export/scraped_data
+"""
+import argparse
+import csv
+import json
+import os
+
+PROCEDURE_COLUMNS = ["code", "type_ent", "genre_ent", "procedure", "redevance", "delais", "pdf_local_paths"]
+DOCUMENT_COLUMNS = ["code", "content_index", "language", "field", "position", "text"]
+CONTENT_FIELDS = ["documents_demandes", "delais", "redevances_a_acquitter", "observations"]
+# json_contents is built from the <name>Fr.pdf then <name>Ar.pdf forms
+LANGUAGES = ["fr", "ar"]
+
+
+# 1) Stream entries out of the top-level JSON array
+def iter_json_array(path, chunk_size=1 << 16):
+    """
+    Yield the elements of a top-level JSON array one by one, reading the file
+    in chunks. Elements are objects, so a successful raw_decode always means
+    the whole element is in the buffer.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buf, pos, eof = f.read(chunk_size).lstrip(), 0, False
+        if not buf.startswith("["):
+            raise ValueError(f"{path} n'est pas un tableau JSON")
+        pos = 1
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buf) and buf[pos] == "]":
+                return
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buf, pos = buf[pos:] + chunk, 0
+                continue
+            yield obj
+            pos = end
+            if pos > chunk_size:
+                buf, pos = buf[pos:], 0
+
+
+def procedure_row(entry):
+    paths = entry.get("pdf_local_paths")
+    if isinstance(paths, list):
+        paths = ";".join(paths)
+    return [entry.get("code"), entry.get("type_ent"), entry.get("genre_ent"), entry.get("procedure"),
+            entry.get("redevance"), entry.get("delais"), paths]
+
+
+def document_rows(entry):
+    for index, content in enumerate(entry.get("json_contents") or []):
+        if not content:
+            continue
+        language = LANGUAGES[index] if index < len(LANGUAGES) else None
+        for field in CONTENT_FIELDS:
+            for position, text in enumerate(content.get(field) or []):
+                yield [entry.get("code"), index, language, field, position, text]
+
+
+# 2) Writers
+def export_xlsx(entries, output):
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    procedures = wb.create_sheet("procedures")
+    documents = wb.create_sheet("documents")
+    procedures.append(PROCEDURE_COLUMNS)
+    documents.append(DOCUMENT_COLUMNS)
+    for entry in entries:
+        procedures.append(procedure_row(entry))
+        for row in document_rows(entry):
+            documents.append(row)
+    path = output if output.endswith(".xlsx") else output + ".xlsx"
+    wb.save(path)
+    return [path]
+
+def export_csv(entries, output):
+    paths = [f"{output}.procedures.csv", f"{output}.documents.csv"]
+    with open(paths[0], "w", newline="", encoding="utf-8") as fp, \
+         open(paths[1], "w", newline="", encoding="utf-8") as fd:
+        procedures, documents = csv.writer(fp), csv.writer(fd)
+        procedures.writerow(PROCEDURE_COLUMNS)
+        documents.writerow(DOCUMENT_COLUMNS)
+        for entry in entries:
+            procedures.writerow(procedure_row(entry))
+            documents.writerows(document_rows(entry))
+    return paths
+
+def export_parquet(entries, output, batch_size=5000):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    string = pa.string()
+    procedures_schema = pa.schema([(c, string) for c in PROCEDURE_COLUMNS])
+    documents_schema = pa.schema([
+        ("code", string), ("content_index", pa.int16()), ("language", string),
+        ("field", string), ("position", pa.int32()), ("text", string),
+    ])
+    paths = [f"{output}.procedures.parquet", f"{output}.documents.parquet"]
+    with pq.ParquetWriter(paths[0], procedures_schema) as wp, \
+         pq.ParquetWriter(paths[1], documents_schema) as wd:
+        procedures, documents = [], []
+
+        def flush(rows, writer, schema):
+            if rows:
+                columns = list(zip(*rows))
+                writer.write_table(pa.Table.from_arrays(
+                    [pa.array(col, type=f.type) for col, f in zip(columns, schema)], schema=schema))
+                rows.clear()
+
+        for entry in entries:
+            procedures.append(procedure_row(entry))
+            documents.extend(document_rows(entry))
+            if len(procedures) >= batch_size:
+                flush(procedures, wp, procedures_schema)
+            if len(documents) >= batch_size:
+                flush(documents, wd, documents_schema)
+        flush(procedures, wp, procedures_schema)
+        flush(documents, wd, documents_schema)
+    return paths
+
+EXPORTERS = {"xlsx": export_xlsx, "csv": export_csv, "parquet": export_parquet}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export scraped_data.json (streaming)")
+    parser.add_argument("--input", default="scraped_data.json")
+    parser.add_argument("--format", choices=sorted(EXPORTERS), default="xlsx")
+    parser.add_argument("--output", default=None,
+                        help="output file (xlsx) or path prefix (csv/parquet); defaults to the input name")
+    args = parser.parse_args()
+
+    output = args.output or os.path.splitext(args.input)[0]
+    written = EXPORTERS[args.format](iter_json_array(args.input), output)
+    print(f"Converted {args.input} → {', '.join(written)}")
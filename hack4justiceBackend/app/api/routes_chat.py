@@ -1,6 +1,16 @@
-from fastapi import APIRouter, HTTPException
+import uuid
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 
+from app.core import config, profiler
+from app.core.admission import AdmissionRejected, controller as admission
+from app.core.catalog import get_catalog
+from app.core.deadline import Deadline
+from app.core.session_memory import SessionBusy
+
 from app.services.chatbot_service import handle_chat_turn
 
 router = APIRouter()
@@ -12,9 +22,36 @@ class ChatRequest(BaseModel):
 class ChatResponse(BaseModel):
     reply: str
 
+def _run_turn(user_id: str, message: str, deadline: Deadline, turn_id: str, x_profile):
+    # runs in the threadpool thread, which is the one to profile
+    try:
+        with profiler.maybe_profile(turn_id, x_profile):
+            return handle_chat_turn(user_id, message, deadline, turn_id)
+    except SessionBusy:
+        # the session lock is held by a turn that did not go through admission
+        raise AdmissionRejected("session_busy", config.ADMISSION_RETRY_AFTER_SECONDS)
+
 @router.post("/chat", response_model=ChatResponse)
-def chat_endpoint(request: ChatRequest):
+async def chat_endpoint(request: ChatRequest, response: Response,
+                  x_timeout_ms: Optional[int] = Header(default=None),
+                  x_profile: Optional[str] = Header(default=None)):
+    # The turn budget starts now; a client may ask for a shorter one than the default.
+    budget = config.CHAT_TURN_BUDGET_SECONDS
+    if x_timeout_ms is not None and x_timeout_ms > 0:
+        budget = min(budget, x_timeout_ms / 1000)
+    deadline = Deadline(budget)
     if not request.user_id or not request.message:
         raise HTTPException(status_code=400, detail="user_id and message are required")
-    reply_text = handle_chat_turn(request.user_id, request.message)
+    turn_id = uuid.uuid4().hex
+    try:
+        # admission waits on the event loop; only admitted turns take a thread
+        async with admission.admit(request.user_id, deadline):
+            reply_text = await run_in_threadpool(
+                _run_turn, request.user_id, request.message, deadline, turn_id, x_profile)
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=429, detail=e.reason,
+                            headers={"Retry-After": str(e.retry_after)})
+    response.headers["X-Turn-Id"] = turn_id
+    # same value as data_version in /api/procedures (hash of scraped_data.json)
+    response.headers["X-Data-Version"] = get_catalog().version
     return ChatResponse(reply=reply_text)
@@ -1 +1,23 @@
+from fastapi import APIRouter
 
+from app.core import deadline, gemini_client, turn_log
+from app.core.admission import controller as admission
+from app.core.session_memory import get_lock_stats
+from app.services import intent_service
+
+router = APIRouter()
+
+@router.get("/health")
+def health():
+    return {"status": "up"}
+
+@router.get("/metrics")
+def metrics():
+    return {
+        "admission": admission.get_stats(),
+        "session_locks": get_lock_stats(),
+        "deadline": deadline.get_stats(),
+        "turn_log": turn_log.get_stats(),
+        "intent_classifier": intent_service.get_stats(),
+        "gemini_batching": gemini_client.get_stats(),
+    }
@@ -0,0 +1,93 @@
+import hashlib
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query, Response
+from pydantic import BaseModel
+
+from app.core import config
+from app.core.catalog import get_catalog
+from app.services.procedure_service import describe, find_procedure, parse_creation_date
+
+router = APIRouter()
+
+class Penalty(BaseModel):
+    creation_date: date
+    due_date: date
+    overdue: bool
+    days_overdue: int
+    fine: int
+
+class ProcedureResponse(BaseModel):
+    code: str
+    type_ent: str
+    genre_ent: str
+    procedure: str
+    documents: List[str]
+    delay: str
+    delay_days: int
+    fee: str
+    base_fee: int
+    observations: List[str]
+    penalty: Optional[Penalty]
+    data_version: str
+
+
+def _parse_date(creation_date: Optional[str]):
+    if creation_date is None:
+        return None
+    created = parse_creation_date(creation_date)
+    if created is None:
+        raise HTTPException(status_code=400, detail="creation_date invalide (JJ/MM/AAAA ou AAAA-MM-JJ)")
+    return created
+
+
+def _cached(entry, created, response: Response, if_none_match: Optional[str]):
+    """
+    The answer only depends on the data version, the entry and, with a
+    penalty, the creation date and today's date: the ETag covers exactly those.
+    """
+    now = datetime.now()
+    key = [get_catalog().version, entry.code]
+    max_age = config.PROCEDURES_CACHE_MAX_AGE
+    if created is not None:
+        key += [created.date().isoformat(), now.date().isoformat()]
+        midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+        max_age = min(max_age, int((midnight - now).total_seconds()))
+    etag = '"' + hashlib.sha256("|".join(key).encode("utf-8")).hexdigest()[:16] + '"'
+    # X-Data-Version matches /api/chat's header and the data_version field
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={max_age}", "X-Data-Version": key[0]}
+
+    if if_none_match:
+        tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+        if etag in tags or "*" in tags:
+            return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return ProcedureResponse(**describe(entry, created))
+
+
+@router.get("/procedures", response_model=ProcedureResponse)
+def procedure_query_endpoint(response: Response,
+                             type_ent: str = Query(..., min_length=1),
+                             procedure: str = Query(..., min_length=1),
+                             update_action: Optional[str] = None,
+                             creation_date: Optional[str] = None,
+                             if_none_match: Optional[str] = Header(default=None)):
+    created = _parse_date(creation_date)
+    entry = find_procedure(type_ent, procedure, update_action)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=(
+            f"Aucune procédure pour le type d'entité « {type_ent} » "
+            f"et la procédure « {update_action or procedure} »"))
+    return _cached(entry, created, response, if_none_match)
+
+
+@router.get("/procedures/{code}", response_model=ProcedureResponse)
+def procedure_endpoint(code: str, response: Response,
+                       creation_date: Optional[str] = None,
+                       if_none_match: Optional[str] = Header(default=None)):
+    created = _parse_date(creation_date)
+    entry = get_catalog().by_code(code)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"Aucune procédure avec le code « {code} »")
+    return _cached(entry, created, response, if_none_match)
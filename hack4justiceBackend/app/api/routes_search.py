@@ -0,0 +1,25 @@
+from typing import List
+
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel
+
+from app.services.search_service import search
+
+router = APIRouter()
+
+class SearchHit(BaseModel):
+    code: str
+    type_ent: str
+    procedure: str
+    score: float
+    documents: List[str]
+
+class SearchResponse(BaseModel):
+    query: str
+    results: List[SearchHit]
+
+@router.get("/search", response_model=SearchResponse)
+def search_endpoint(q: str = Query(..., min_length=1), limit: int = Query(10, ge=1, le=100)):
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="q is required")
+    return SearchResponse(query=q, results=search(q, limit))
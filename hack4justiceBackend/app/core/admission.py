@@ -0,0 +1,185 @@
+# app/core/admission.py
+"""
+Admission control in front of handle_chat_turn.
+
+1. Per-user token bucket: ADMISSION_USER_RATE turns/second with bursts of
+   ADMISSION_USER_BURST; an empty bucket is rejected at once.
+2. One turn per user at a time: a user's next turn waits (bounded by the
+   request deadline) before it competes for a global slot, so one user's
+   backlog never holds global capacity.
+3. Global concurrency limit: at most ADMISSION_MAX_CONCURRENT turns run at a
+   time; up to ADMISSION_MAX_QUEUE more wait (bounded by ADMISSION_QUEUE_TIMEOUT
+   and the request deadline), anything beyond that is shed immediately, before
+   it spends a token.
+
+admit() is async and runs on the event loop, so queued requests do not hold
+threadpool threads; the route dispatches the (blocking) turn to the threadpool
+only once admitted. Rejections raise AdmissionRejected carrying a Retry-After
+hint; the route turns it into a 429.
+"""
+
+import asyncio
+import collections
+import contextlib
+import math
+import threading
+import time
+
+from app.core import config
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class _TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, now: float):
+        self.tokens = tokens
+        self.updated = now
+
+
+class AdmissionController:
+    def __init__(self, user_rate: float, user_burst: float, max_concurrent: int,
+                 max_queue: int, queue_timeout: float):
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+
+        self._buckets = {}
+        self._buckets_lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+        # only touched from the event loop thread
+        self._active = 0
+        self._waiters = collections.deque()
+        # user_id → [asyncio.Lock, number of turns holding or waiting for it]
+        self._user_turns = {}
+        self._stats = {"admitted": 0, "rate_limited": 0, "session_busy": 0,
+                       "queue_full": 0, "queue_timeout": 0}
+
+    # ── per-user token bucket ──────────────────────────────────────────────────
+    def _take_token(self, user_id: str):
+        now = time.monotonic()
+        with self._buckets_lock:
+            bucket = self._buckets.get(user_id)
+            if bucket is None:
+                bucket = self._buckets[user_id] = _TokenBucket(self.user_burst, now)
+            else:
+                bucket.tokens = min(self.user_burst, bucket.tokens + (now - bucket.updated) * self.user_rate)
+                bucket.updated = now
+            if bucket.tokens < 1:
+                self._stats["rate_limited"] += 1
+                raise AdmissionRejected("rate_limited", (1 - bucket.tokens) / self.user_rate)
+            bucket.tokens -= 1
+            self._sweep(now)
+
+    def _sweep(self, now: float):
+        """Forget buckets idle long enough to have refilled completely."""
+        if now - self._last_sweep < 60:
+            return
+        self._last_sweep = now
+        refill_time = self.user_burst / self.user_rate
+        for user_id in [u for u, b in self._buckets.items() if now - b.updated >= refill_time]:
+            del self._buckets[user_id]
+
+    # ── one turn per user ──────────────────────────────────────────────────────
+    @contextlib.asynccontextmanager
+    async def _user_turn(self, user_id: str, deadline):
+        """Event-loop counterpart of session_memory.session_lock, taken first."""
+        entry = self._user_turns.get(user_id)
+        if entry is None:
+            entry = self._user_turns[user_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            timeout = deadline.remaining() if deadline is not None else None
+            try:
+                await asyncio.wait_for(entry[0].acquire(), timeout)
+            except asyncio.TimeoutError:
+                self._stats["session_busy"] += 1
+                raise AdmissionRejected("session_busy", config.ADMISSION_RETRY_AFTER_SECONDS)
+            try:
+                yield
+            finally:
+                entry[0].release()
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._user_turns[user_id]
+
+    # ── global concurrency limit with bounded queue ────────────────────────────
+    def _queue_full(self) -> bool:
+        return self._active >= self.max_concurrent and len(self._waiters) >= self.max_queue
+
+    @contextlib.asynccontextmanager
+    async def admit(self, user_id: str, deadline=None):
+        if self._queue_full():
+            self._stats["queue_full"] += 1
+            raise AdmissionRejected("overloaded", config.ADMISSION_RETRY_AFTER_SECONDS)
+        self._take_token(user_id)
+        async with self._user_turn(user_id, deadline):
+            await self._acquire_slot(deadline)
+            self._stats["admitted"] += 1
+            try:
+                yield
+            finally:
+                self._release_slot()
+
+    async def _acquire_slot(self, deadline):
+        if self._active < self.max_concurrent and not self._waiters:
+            self._active += 1
+            return
+        if self._queue_full():
+            # the queue filled up while this turn waited for the user's previous one
+            self._stats["queue_full"] += 1
+            raise AdmissionRejected("overloaded", config.ADMISSION_RETRY_AFTER_SECONDS)
+        timeout = self.queue_timeout
+        if deadline is not None:
+            timeout = min(timeout, deadline.remaining())
+        # a released slot is handed over by resolving the waiter's future
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait({waiter}, timeout=timeout)
+        except asyncio.CancelledError:
+            if waiter.done():
+                self._release_slot()
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            raise
+        if not waiter.done():
+            waiter.cancel()
+            self._waiters.remove(waiter)
+            self._stats["queue_timeout"] += 1
+            raise AdmissionRejected("overloaded", config.ADMISSION_RETRY_AFTER_SECONDS)
+
+    def _release_slot(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._active -= 1
+
+    def get_stats(self) -> dict:
+        stats = dict(self._stats, active=self._active, queue_depth=len(self._waiters),
+                     users_with_turns=len(self._user_turns))
+        with self._buckets_lock:
+            stats["tracked_users"] = len(self._buckets)
+        return stats
+
+
+controller = AdmissionController(
+    config.ADMISSION_USER_RATE,
+    config.ADMISSION_USER_BURST,
+    config.ADMISSION_MAX_CONCURRENT,
+    config.ADMISSION_MAX_QUEUE,
+    config.ADMISSION_QUEUE_TIMEOUT,
+)
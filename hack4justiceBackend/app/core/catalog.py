@@ -0,0 +1,140 @@
+# app/core/catalog.py
+"""
+Normalised, interned view of scraped_data.json.
+
+Every distinct document / delay / fee / observation line gets one integer ID in
+a shared StringTable; entries keep only compact arrays of those IDs (with
+duplicates removed, in first-seen order) and strings are joined back only when
+an answer is rendered.
+"""
+
+import hashlib
+import json
+import sys
+import threading
+import unicodedata
+from array import array
+
+CONTENT_FIELDS = ("documents_demandes", "delais", "redevances_a_acquitter", "observations")
+
+
+def fold_key(text: str) -> str:
+    """Lookup key: lowercase, no accents, straight apostrophes, single spaces."""
+    decomposed = unicodedata.normalize("NFKD", (text or "").lower().replace("’", "'"))
+    return " ".join("".join(ch for ch in decomposed if not unicodedata.combining(ch)).split())
+
+
+class StringTable:
+    """Bidirectional str ↔ int mapping; whitespace is collapsed before interning."""
+    __slots__ = ("_ids", "_strings")
+
+    def __init__(self):
+        self._ids = {}
+        self._strings = []
+
+    def intern(self, text: str) -> int:
+        text = " ".join(text.split())
+        sid = self._ids.get(text)
+        if sid is None:
+            sid = len(self._strings)
+            self._ids[text] = sid
+            self._strings.append(sys.intern(text))
+        return sid
+
+    def __getitem__(self, sid: int) -> str:
+        return self._strings[sid]
+
+    def __len__(self) -> int:
+        return len(self._strings)
+
+    def lookup(self, ids) -> list:
+        return [self._strings[i] for i in ids]
+
+    def join(self, ids, sep: str = ", ") -> str:
+        return sep.join(self._strings[i] for i in ids)
+
+
+class Content:
+    """One element of json_contents (index 0 = French, 1 = Arabic) as ID arrays."""
+    __slots__ = CONTENT_FIELDS
+
+    def __init__(self, raw: dict, strings: StringTable):
+        for field in CONTENT_FIELDS:
+            ids = dict.fromkeys(strings.intern(s) for s in raw.get(field) or [] if s and s.strip())
+            setattr(self, field, array("I", ids))
+
+
+class Entry:
+    __slots__ = ("code", "type_ent", "genre_ent", "procedure", "redevance", "delais", "contents")
+
+    def __init__(self, raw: dict, strings: StringTable):
+        for field in ("code", "type_ent", "genre_ent", "procedure", "redevance", "delais"):
+            setattr(self, field, sys.intern(raw.get(field) or ""))
+        self.contents = tuple(Content(c, strings) for c in raw.get("json_contents") or [] if c)
+
+    def content(self, index: int = 0):
+        return self.contents[index] if index < len(self.contents) else None
+
+
+class Catalog:
+    __slots__ = ("strings", "entries", "version", "_by_key", "_by_code")
+
+    def __init__(self, raw_entries, version: str = ""):
+        self.version = version
+        self.strings = StringTable()
+        self.entries = tuple(Entry(raw, self.strings) for raw in raw_entries)
+        self._by_key = {}
+        self._by_code = {}
+        for entry in self.entries:
+            # first entry wins, as with the previous linear scan
+            self._by_key.setdefault((fold_key(entry.type_ent), fold_key(entry.procedure)), entry)
+            self._by_code.setdefault(entry.code.strip().upper(), entry)
+
+    def find(self, type_ent: str, procedure: str):
+        """Entry for (type_ent, procedure), compared case- and accent-insensitively."""
+        return self._by_key.get((fold_key(type_ent), fold_key(procedure)))
+
+    def by_code(self, code: str):
+        return self._by_code.get(" ".join(code.split()).upper())
+
+    def texts(self, entry: Entry, field: str, index: int = 0) -> list:
+        """Rendered strings of `field` in the entry's json_contents[index]."""
+        content = entry.content(index)
+        return self.strings.lookup(getattr(content, field)) if content else []
+
+
+_catalog = None
+_reload_hooks = []
+_lock = threading.Lock()
+
+
+def load_catalog(path: str = "app/data/scraped_data.json") -> Catalog:
+    """
+    (Re)load scraped_data.json; the raw dicts are dropped once interned.
+    catalog.version is a hash of the file, so it changes with any data change.
+    Registered hooks are then called with the new catalog so derived
+    structures (search index, precomputed answers) are rebuilt with it.
+    """
+    global _catalog
+    with open(path, "rb") as f:
+        raw = f.read()
+    catalog = Catalog(json.loads(raw.decode("utf-8")), hashlib.sha256(raw).hexdigest()[:16])
+    with _lock:
+        _catalog = catalog
+    print(f">>> Loaded catalog: {len(catalog.entries)} entries, {len(catalog.strings)} distinct strings")
+    for hook in list(_reload_hooks):
+        hook(catalog)
+    return catalog
+
+
+def get_catalog() -> Catalog:
+    return _catalog
+
+
+def register_reload_hook(hook):
+    """Call hook(catalog) now and after every load_catalog()."""
+    _reload_hooks.append(hook)
+    hook(_catalog)
+
+
+load_catalog()
@@ -1 +1,64 @@
+# app/core/config.py
 
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Local intent classifier (app/services/intent_service.py)
+# ────────────────────────────────────────────────────────────────────────────────
+INTENT_MODEL_PATH = os.getenv("INTENT_MODEL_PATH", "app/data/intent_model.npz")
+# Below this probability the local model defers to Gemini.
+INTENT_CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.9"))
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Turn log (app/core/turn_log.py)
+# ────────────────────────────────────────────────────────────────────────────────
+TURN_LOG_ENABLED = os.getenv("TURN_LOG_ENABLED", "1") == "1"
+TURN_LOG_DIR = os.getenv("TURN_LOG_DIR", "logs/turns")
+TURN_LOG_QUEUE_SIZE = int(os.getenv("TURN_LOG_QUEUE_SIZE", "10000"))
+TURN_LOG_SEGMENT_BYTES = int(os.getenv("TURN_LOG_SEGMENT_BYTES", str(64 * 1024 * 1024)))
+# Key for hashing user ids, so raw ids never reach the log.
+TURN_LOG_SALT = os.getenv("TURN_LOG_SALT", "")
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Per-turn latency budget (app/core/deadline.py)
+# ────────────────────────────────────────────────────────────────────────────────
+CHAT_TURN_BUDGET_SECONDS = float(os.getenv("CHAT_TURN_BUDGET_SECONDS", "8.0"))
+# Gemini calls are not started with less than this much budget left.
+CHAT_TURN_RESERVE_SECONDS = float(os.getenv("CHAT_TURN_RESERVE_SECONDS", "1.0"))
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Per-turn profiling (app/core/profiler.py)
+# ────────────────────────────────────────────────────────────────────────────────
+# Requests with "X-Profile: <token>" are profiled; empty disables the header.
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0.0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "2"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "logs/profiles")
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "200"))
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Admission control on /api/chat (app/core/admission.py)
+# ────────────────────────────────────────────────────────────────────────────────
+ADMISSION_USER_RATE = float(os.getenv("ADMISSION_USER_RATE", "0.5"))     # turns/s per user_id
+ADMISSION_USER_BURST = float(os.getenv("ADMISSION_USER_BURST", "5"))
+ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", "16"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "32"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2.0"))
+ADMISSION_RETRY_AFTER_SECONDS = float(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "1"))
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Micro-batching of Gemini classification calls (app/core/gemini_client.py)
+# ────────────────────────────────────────────────────────────────────────────────
+GEMINI_BATCH_ENABLED = os.getenv("GEMINI_BATCH_ENABLED", "1") == "1"
+# How long the first request of a batch waits for others to join.
+GEMINI_BATCH_WINDOW_MS = float(os.getenv("GEMINI_BATCH_WINDOW_MS", "25"))
+GEMINI_BATCH_MAX_SIZE = int(os.getenv("GEMINI_BATCH_MAX_SIZE", "16"))
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Direct procedure lookup (app/api/routes_procedures.py)
+# ────────────────────────────────────────────────────────────────────────────────
+# Cache-Control max-age; answers with a penalty also expire at midnight.
+PROCEDURES_CACHE_MAX_AGE = int(os.getenv("PROCEDURES_CACHE_MAX_AGE", "3600"))
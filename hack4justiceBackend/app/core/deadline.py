@@ -0,0 +1,89 @@
+# app/core/deadline.py
+"""
+Per-request latency budget.
+
+A Deadline is created when /api/chat receives a request and is passed down to
+every validator. Gemini calls get the remaining budget as their timeout and
+are not started at all once the budget is nearly spent; the turn then falls
+through to asking the next slot prompt. The validation of the slot the bot is
+waiting on is the exception: it always runs (see Deadline.for_required_call),
+otherwise a conversation under a short budget could never progress.
+"""
+
+import threading
+import time
+
+from app.core import config
+
+_stats_lock = threading.Lock()
+_STATS = {"turns": 0, "overruns": 0, "skipped_calls": 0, "timed_out_calls": 0}
+
+
+class Deadline:
+    __slots__ = ("started", "expires_at", "reserve", "required")
+
+    def __init__(self, budget_s: float = None, reserve_s: float = None):
+        budget_s = config.CHAT_TURN_BUDGET_SECONDS if budget_s is None else budget_s
+        reserve_s = config.CHAT_TURN_RESERVE_SECONDS if reserve_s is None else reserve_s
+        self.started = time.monotonic()
+        self.expires_at = self.started + budget_s
+        # a short client budget must still leave room for calls
+        self.reserve = min(reserve_s, budget_s / 2)
+        self.required = False
+
+    def for_required_call(self) -> "Deadline":
+        """
+        Same budget, for a call the turn cannot do without (validating the
+        awaited slot): it is never skipped and gets at least
+        CHAT_TURN_RESERVE_SECONDS as timeout, even if that overruns the budget.
+        """
+        deadline = Deadline.__new__(Deadline)
+        deadline.started, deadline.expires_at = self.started, self.expires_at
+        deadline.reserve = max(self.reserve, config.CHAT_TURN_RESERVE_SECONDS)
+        deadline.required = True
+        return deadline
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def call_timeout(self) -> float:
+        """Timeout for a Gemini call started now."""
+        return max(self.remaining(), self.reserve) if self.required else self.remaining()
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def nearly_spent(self) -> bool:
+        """True when there is not enough budget left to start an optional call."""
+        return not self.required and self.expires_at - time.monotonic() < self.reserve
+
+    def elapsed_ms(self) -> float:
+        return (time.monotonic() - self.started) * 1000
+
+
+def _bump(counter: str):
+    with _stats_lock:
+        _STATS[counter] += 1
+
+
+def record_skipped_call():
+    _bump("skipped_calls")
+
+
+def record_timed_out_call():
+    _bump("timed_out_calls")
+
+
+def record_turn(deadline: Deadline) -> bool:
+    """Count a finished turn; returns True if it overran its budget."""
+    overrun = deadline.expired()
+    with _stats_lock:
+        _STATS["turns"] += 1
+        if overrun:
+            _STATS["overruns"] += 1
+    return overrun
+
+
+def get_stats() -> dict:
+    with _stats_lock:
+        return dict(_STATS)
@@ -1,8 +1,16 @@
 import os
 import json
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
 from dotenv import load_dotenv
 import re
+import threading
+import time
+
+from app.core import config
+from app.core import deadline as deadlines
+from app.core import turn_log
+
 load_dotenv()
 
 def initialize_genai():
@@ -16,10 +24,14 @@ initialize_genai()
 with open("app/data/gemini_guided_prompts.json", "r", encoding="utf-8") as f:
     GUIDED_PROMPTS = json.load(f)
 
-def ask_gemini(validation_type: str, user_input: str) -> dict:
+def ask_gemini(validation_type: str, user_input: str, deadline=None, placeholders: dict = None) -> dict:
     """
     Uses both the description and example_prompt_format from GUIDED_PROMPTS[validation_type]
-    to craft a rich and guided prompt for Gemini.
+    to craft a rich and guided prompt for Gemini. `placeholders` fills in any
+    other <TAG> of the description (e.g. {"<CANDIDATES>": ...}).
+
+    With a deadline, the call is skipped once the turn's budget is nearly spent
+    and otherwise times out with it; both cases return {"error": "deadline_exceeded"}.
     """
     template = GUIDED_PROMPTS.get(validation_type)
     if template is None:
@@ -27,18 +39,46 @@ def ask_gemini(validation_type: str, user_input: str) -> dict:
 
     # Combine description and example prompt
     description = template["description"].replace('<USER_PROMPT>',user_input).strip()
+    for tag, value in (placeholders or {}).items():
+        description = description.replace(tag, value)
     example = template["example_prompt_format"].replace("<USER_INPUT_HERE>", user_input).strip()
 
     raw_prompt = f"{description}"
 
-    # Call Gemini
+    # Call Gemini (within the remaining turn budget, if any)
+    started = time.perf_counter()
+    request_options = {}
+    if deadline is not None:
+        if deadline.nearly_spent():
+            deadlines.record_skipped_call()
+            parsed = {"error": "deadline_exceeded"}
+            turn_log.record_call(validation_type, "skipped", user_input, parsed, 0.0)
+            return parsed
+        request_options["timeout"] = deadline.call_timeout()
+
     model = genai.GenerativeModel("models/gemini-2.0-flash")
-    g_response = model.generate_content(raw_prompt)
+    try:
+        g_response = model.generate_content(raw_prompt, request_options=request_options)
+    except google_exceptions.DeadlineExceeded:
+        deadlines.record_timed_out_call()
+        parsed = {"error": "deadline_exceeded"}
+        turn_log.record_call(validation_type, "timeout", user_input, parsed,
+                             (time.perf_counter() - started) * 1000)
+        return parsed
     raw_text = g_response.text.strip()
+    parsed = _parse_json(raw_text)
+    if parsed is None:
+        parsed = {"error": "invalid_json", "raw_text": raw_text}
 
-    # Strip markdown-style code fences
+    turn_log.record_call(validation_type, "gemini", user_input, parsed,
+                         (time.perf_counter() - started) * 1000)
+    return parsed
+
+
+def _parse_json(raw_text: str):
+    """Parse Gemini's answer, stripping markdown code fences; None if it is not JSON."""
     cleaned = raw_text
-    fence_pattern = r"^```(?:json)?\s*(\{.*?\})\s*```$"
+    fence_pattern = r"^```(?:json)?\s*([\{\[].*?[\}\]])\s*```$"
     m = re.search(fence_pattern, raw_text, re.DOTALL)
     if m:
         cleaned = m.group(1).strip()
@@ -51,10 +91,231 @@ def ask_gemini(validation_type: str, user_input: str) -> dict:
                 lines = lines[:-1]
             cleaned = "\n".join(lines).strip()
 
-    # Attempt JSON parse
     try:
-        parsed = json.loads(cleaned)
+        return json.loads(cleaned)
     except json.JSONDecodeError:
-        return {"error": "invalid_json", "raw_text": raw_text}
+        return None
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Micro-batching of classification calls
+# ────────────────────────────────────────────────────────────────────────────────
+# Concurrent turns asking the same short classification are sent as one prompt
+# (the long instruction once, the user inputs numbered) that returns a JSON
+# array of labels. A caller arriving while no batch is being collected leads
+# the next one. If another batch is in flight (i.e. under load) it waits up to
+# GEMINI_BATCH_WINDOW_MS for others to join, otherwise it sends at once; a
+# caller that is still alone then simply makes its own call. The batch is sent
+# without holding the lock, so the next one forms (and is sent) meanwhile.
+# Items missing or malformed in the answer are retried individually with
+# ask_gemini(); if the call itself fails, every caller gets the error.
+
+# validation_type → JSON key each item of the batched answer must carry
+BATCHABLE = {
+    "classify_intent": "intent_type",
+    "one_of_documents_or_penalty": "choice",
+}
+
+_FALLBACK = object()
+
+
+class _Pending:
+    __slots__ = ("user_input", "deadline", "result", "error", "queued", "recorded")
+
+    def __init__(self, user_input: str, deadline=None):
+        self.user_input = user_input
+        self.deadline = deadline
+        self.result = None
+        self.error = None
+        self.queued = True
+        self.recorded = False
+
+
+class _MicroBatcher:
+    def __init__(self, validation_type: str, window_s: float, max_size: int):
+        self.validation_type = validation_type
+        self.key = BATCHABLE[validation_type]
+        self.window_s = window_s
+        self.max_size = max(1, max_size)
+        self._cond = threading.Condition()
+        self._pending = []
+        self._leading = False
+        self._in_flight = 0
+
+    def submit(self, user_input: str, deadline=None) -> _Pending:
+        """
+        Wait until user_input is answered. item.result is the parsed answer,
+        {"error": "deadline_exceeded"} if the deadline ran out while still
+        queued, or _FALLBACK if the batch gave no usable answer for it;
+        item.error is the exception if the Gemini call failed, and
+        item.recorded tells whether the call is already in the turn log.
+        """
+        item = _Pending(user_input, deadline)
+        with self._cond:
+            self._pending.append(item)
+            self._cond.notify_all()
+            while item.result is None:
+                if not self._leading and item.queued:
+                    self._lead(deadline)
+                    continue
+                # once its batch is in flight an item waits for the answer,
+                # which the batch's request timeout bounds
+                timeout = None
+                if deadline is not None and item.queued:
+                    timeout = deadline.call_timeout()
+                    if timeout <= 0:
+                        self._pending.remove(item)
+                        item.result = {"error": "deadline_exceeded"}
+                        break
+                self._cond.wait(timeout)
+        return item
+
+    def _lead(self, deadline):
+        """Called with the condition held; collects, sends and distributes one batch."""
+        self._leading = True
+        try:
+            if self._in_flight:
+                window_end = time.monotonic() + self.window_s
+                if deadline is not None:
+                    window_end = min(window_end, time.monotonic() + deadline.call_timeout())
+                while len(self._pending) < self.max_size:
+                    left = window_end - time.monotonic()
+                    if left <= 0:
+                        break
+                    self._cond.wait(left)
+            batch = self._pending[:self.max_size]
+            del self._pending[:self.max_size]
+            for item in batch:
+                item.queued = False
+            self._in_flight += 1
+        finally:
+            # let the next batch form while this one is being sent
+            self._leading = False
+            self._cond.notify_all()
 
+        results, error = [_FALLBACK] * len(batch), None
+        self._cond.release()
+        try:
+            results = self._send(batch)
+        except Exception as e:
+            print(f"⚠️ Batch Gemini '{self.validation_type}' en échec : {e!r}")
+            if len(batch) > 1:
+                _record_batch(len(batch), 0, failed=True)
+            error = e
+        finally:
+            self._cond.acquire()
+            self._in_flight -= 1
+            for item, result in zip(batch, results):
+                # re-raised by each caller on its own thread
+                item.error = error
+                item.result = result
+            self._cond.notify_all()
+
+    def _send(self, batch) -> list:
+        if len(batch) == 1:
+            # a batch of one only ever holds the leader's own item, so the
+            # call is made (and recorded in the turn log) on its own thread
+            _record_batch(1, 0)
+            parsed = ask_gemini(self.validation_type, batch[0].user_input, batch[0].deadline)
+            batch[0].recorded = True
+            return [parsed]
+
+        numbered = "\n".join(f"{i}. {json.dumps(item.user_input, ensure_ascii=False)}"
+                             for i, item in enumerate(batch, 1))
+        raw_prompt = GUIDED_PROMPTS[self.validation_type]["batch_description"] \
+            .replace("<USER_PROMPTS>", numbered).strip()
+
+        # the most patient member sets the timeout; items whose own deadline
+        # runs out first are answered late rather than dropped
+        request_options = {}
+        if all(item.deadline is not None for item in batch):
+            request_options["timeout"] = max(item.deadline.call_timeout() for item in batch)
+
+        model = genai.GenerativeModel("models/gemini-2.0-flash")
+        g_response = model.generate_content(raw_prompt, request_options=request_options)
+        labels = _parse_json(g_response.text.strip())
+        if not isinstance(labels, list) or len(labels) != len(batch):
+            labels = []
+
+        results = []
+        for i in range(len(batch)):
+            label = labels[i] if i < len(labels) else None
+            if isinstance(label, dict) and isinstance(label.get(self.key), str):
+                results.append({self.key: label[self.key]})
+            else:
+                results.append(_FALLBACK)
+        _record_batch(len(batch), sum(r is _FALLBACK for r in results))
+        return results
+
+
+_batchers = {}
+_batchers_lock = threading.Lock()
+_batch_stats = {"batches": 0, "batched_items": 0, "failed_batches": 0, "single_calls": 0,
+                "fallbacks": 0, "max_batch_size": 0}
+
+
+def _record_batch(size: int, fallbacks: int, failed: bool = False):
+    with _batchers_lock:
+        if failed:
+            _batch_stats["failed_batches"] += 1
+        if size == 1:
+            _batch_stats["single_calls"] += 1
+        else:
+            _batch_stats["batches"] += 1
+            _batch_stats["batched_items"] += size
+            _batch_stats["max_batch_size"] = max(_batch_stats["max_batch_size"], size)
+        _batch_stats["fallbacks"] += fallbacks
+
+
+def _batcher_for(validation_type: str) -> _MicroBatcher:
+    with _batchers_lock:
+        batcher = _batchers.get(validation_type)
+        if batcher is None:
+            batcher = _batchers[validation_type] = _MicroBatcher(
+                validation_type, config.GEMINI_BATCH_WINDOW_MS / 1000, config.GEMINI_BATCH_MAX_SIZE)
+        return batcher
+
+
+def ask_gemini_batched(validation_type: str, user_input: str, deadline=None) -> dict:
+    """
+    Same contract as ask_gemini(); BATCHABLE validations are grouped with
+    concurrent callers into a single Gemini request.
+    """
+    if not config.GEMINI_BATCH_ENABLED or validation_type not in BATCHABLE:
+        return ask_gemini(validation_type, user_input, deadline)
+    if deadline is not None and deadline.nearly_spent():
+        return ask_gemini(validation_type, user_input, deadline)  # records the skip
+
+    started = time.perf_counter()
+    item = _batcher_for(validation_type).submit(user_input, deadline)
+    if isinstance(item.error, google_exceptions.DeadlineExceeded):
+        deadlines.record_timed_out_call()
+        parsed = {"error": "deadline_exceeded"}
+        turn_log.record_call(validation_type, "timeout", user_input, parsed,
+                             (time.perf_counter() - started) * 1000)
+        return parsed
+    if item.error is not None:
+        raise item.error
+    parsed = item.result
+    if item.recorded:
+        return parsed
+    if parsed is _FALLBACK:
+        return ask_gemini(validation_type, user_input, deadline)
+    source = "gemini_batch"
+    if "error" in parsed:
+        deadlines.record_skipped_call()
+        source = "skipped"
+    turn_log.record_call(validation_type, source, user_input, parsed,
+                         (time.perf_counter() - started) * 1000)
     return parsed
+
+
+def get_stats() -> dict:
+    with _batchers_lock:
+        stats = dict(_batch_stats)
+    stats["enabled"] = config.GEMINI_BATCH_ENABLED
+    stats["window_ms"] = config.GEMINI_BATCH_WINDOW_MS
+    stats["max_size"] = config.GEMINI_BATCH_MAX_SIZE
+    stats["mean_batch_size"] = (round(stats["batched_items"] / stats["batches"], 2)
+                                if stats["batches"] else None)
+    return stats
@@ -0,0 +1,125 @@
+# app/core/profiler.py
+"""
+On-demand statistical profiling of single chat turns.
+
+A turn is profiled when the request carries X-Profile: <PROFILE_ADMIN_TOKEN>,
+or at random with probability PROFILE_SAMPLE_RATE. A sampler thread then reads
+the request thread's stack every PROFILE_INTERVAL_MS and the result is written
+as collapsed stacks (one "root;…;leaf count" line per stack, the input format
+of flamegraph.pl / speedscope) to PROFILE_DIR/<turn_id>.folded. Only the
+newest PROFILE_MAX_FILES profiles are kept. When profiling is not requested
+the cost is a couple of comparisons.
+"""
+
+import contextlib
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from app.core import config
+
+_prune_lock = threading.Lock()
+
+
+def should_profile(header_value) -> bool:
+    if header_value and config.PROFILE_ADMIN_TOKEN:
+        # bytes: compare_digest rejects non-ASCII str
+        return hmac.compare_digest(header_value.encode("utf-8"), config.PROFILE_ADMIN_TOKEN.encode("utf-8"))
+    return config.PROFILE_SAMPLE_RATE > 0 and random.random() < config.PROFILE_SAMPLE_RATE
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{frame.f_globals.get('__name__', '?')}:{code.co_qualname}"
+
+
+class SamplingProfiler:
+    """Samples one thread's Python stack from a background thread."""
+
+    def __init__(self, thread_id: int, interval_s: float):
+        self.thread_id = thread_id
+        self.interval_s = interval_s
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="turn-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            # leaf keeps its line number so e.g. a print() line shows up on its own
+            labels = [f"{_frame_label(frame)}:{frame.f_lineno}"]
+            frame = frame.f_back
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            self.stacks[";".join(reversed(labels))] += 1
+
+
+def _write_profile(turn_id: str, stacks: Counter, elapsed_s: float) -> str:
+    os.makedirs(config.PROFILE_DIR, exist_ok=True)
+    path = os.path.join(config.PROFILE_DIR, f"{turn_id}.folded")
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, count in stacks.most_common():
+            f.write(f"{stack} {count}\n")
+    print(f">>> Profile for turn {turn_id}: {sum(stacks.values())} samples "
+          f"over {elapsed_s * 1000:.0f} ms → {path}")
+
+    with _prune_lock:
+        _prune_profiles()
+    return path
+
+
+def _prune_profiles():
+    """Keep the newest PROFILE_MAX_FILES; other workers may delete files meanwhile."""
+    profiles = []
+    for name in os.listdir(config.PROFILE_DIR):
+        if not name.endswith(".folded"):
+            continue
+        path = os.path.join(config.PROFILE_DIR, name)
+        try:
+            profiles.append((os.path.getmtime(path), path))
+        except FileNotFoundError:
+            continue
+    profiles.sort()
+    for _, old in profiles[: max(0, len(profiles) - config.PROFILE_MAX_FILES)]:
+        try:
+            os.remove(old)
+        except FileNotFoundError:
+            pass
+
+
+@contextlib.contextmanager
+def _profiled(turn_id: str):
+    profiler = SamplingProfiler(threading.get_ident(), config.PROFILE_INTERVAL_MS / 1000)
+    started = time.perf_counter()
+    profiler.start()
+    try:
+        yield
+    finally:
+        stacks = profiler.stop()
+        # profiling must never fail the turn (or hide its own exception)
+        try:
+            _write_profile(turn_id, stacks, time.perf_counter() - started)
+        except Exception as e:
+            print(f"⚠️ Profil du tour {turn_id} non écrit : {e}")
+
+
+def maybe_profile(turn_id: str, header_value=None):
+    """Context manager profiling the enclosed block if this request is selected."""
+    if should_profile(header_value):
+        return _profiled(turn_id)
+    return contextlib.nullcontext()
@@ -1,7 +1,66 @@
 # app/core/session_memory.py
 
+import contextlib
+import threading
+import time
+
 user_sessions = {}
 
+# user_id → [lock, number of turns holding or waiting for it]
+_session_locks = {}
+_session_locks_guard = threading.Lock()
+_LOCK_STATS = {"acquisitions": 0, "contended": 0, "timeouts": 0, "wait_ms_total": 0.0, "wait_ms_max": 0.0}
+
+
+class SessionBusy(Exception):
+    """Raised when a turn cannot get its session's lock within its timeout."""
+
+
+@contextlib.contextmanager
+def session_lock(user_id: str, timeout: float = None):
+    """
+    Serialize turns of the same session. Locks are created on first use and
+    dropped as soon as no turn holds or waits for them, so different users
+    never share a lock. Waits at most `timeout` seconds (forever if None),
+    then raises SessionBusy. Yields the time spent waiting, in milliseconds.
+    """
+    with _session_locks_guard:
+        entry = _session_locks.get(user_id)
+        if entry is None:
+            entry = _session_locks[user_id] = [threading.Lock(), 0]
+        entry[1] += 1
+
+    started = time.perf_counter()
+    contended = not entry[0].acquire(blocking=False)
+    if contended and not entry[0].acquire(timeout=-1 if timeout is None else timeout):
+        with _session_locks_guard:
+            _LOCK_STATS["timeouts"] += 1
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _session_locks[user_id]
+        raise SessionBusy(user_id)
+    waited_ms = (time.perf_counter() - started) * 1000
+    try:
+        with _session_locks_guard:
+            _LOCK_STATS["acquisitions"] += 1
+            if contended:
+                _LOCK_STATS["contended"] += 1
+            _LOCK_STATS["wait_ms_total"] += waited_ms
+            _LOCK_STATS["wait_ms_max"] = max(_LOCK_STATS["wait_ms_max"], waited_ms)
+        yield waited_ms
+    finally:
+        entry[0].release()
+        with _session_locks_guard:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _session_locks[user_id]
+
+
+def get_lock_stats() -> dict:
+    with _session_locks_guard:
+        return dict(_LOCK_STATS, live_locks=len(_session_locks))
+
+
 def get_user_state(user_id: str) -> dict:
     """
     Initialize or retrieve the session for user_id:
@@ -44,5 +103,4 @@ def set_awaiting_slot(user_id: str, slot_key: str):
 
 def reset_session(user_id: str):
     """Delete the user’s session so they start fresh next time."""
-    if user_id in user_sessions:
-        del user_sessions[user_id]
+    user_sessions.pop(user_id, None)
@@ -0,0 +1,228 @@
+# app/core/turn_log.py
+"""
+Append-only log of chat turns for analytics, replay and classifier training.
+
+The request path only builds a small dict and drops it into a bounded queue
+(log_turn never blocks: when the queue is full the record is counted as
+dropped). A daemon thread serialises records to JSONL segments under
+TURN_LOG_DIR; the active segment ends in '.jsonl.open' and is renamed to
+'.jsonl' once it reaches TURN_LOG_SEGMENT_BYTES or the process exits.
+
+    python -m app.core.turn_log compact [out.parquet] [--delete]
+"""
+
+import atexit
+import contextvars
+import glob
+import hashlib
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+from app.core import config
+
+_calls = contextvars.ContextVar("turn_log_calls", default=None)
+
+_STATS = {"logged": 0, "dropped": 0, "segments": 0}
+_STOP = object()
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# 1) Per-turn validator trace
+# ────────────────────────────────────────────────────────────────────────────────
+def begin_turn() -> list:
+    """Start collecting validator calls for the current request context."""
+    calls = []
+    _calls.set(calls)
+    return calls
+
+
+def record_call(validator: str, source: str, user_input: str, result, elapsed_ms: float):
+    """Attach one validator call (local model or Gemini) to the current turn."""
+    calls = _calls.get()
+    if calls is not None:
+        calls.append({
+            "validator": validator,
+            "source": source,
+            "input": user_input,
+            "result": result,
+            "ms": round(elapsed_ms, 3),
+        })
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# 2) Background writer
+# ────────────────────────────────────────────────────────────────────────────────
+class _TurnLogWriter:
+    def __init__(self, directory: str, max_queue: int, segment_bytes: int, salt: str):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.salt = salt.encode("utf-8")
+        self.queue = queue.Queue(maxsize=max_queue)
+        self._file = None
+        self._path = None
+        self._thread = threading.Thread(target=self._run, name="turn-log-writer", daemon=True)
+        os.makedirs(directory, exist_ok=True)
+        self._thread.start()
+
+    def put(self, record: dict):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _STATS["dropped"] += 1
+
+    def close(self, timeout: float = 2.0):
+        try:
+            self.queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def _hash_user(self, user_id: str) -> str:
+        return hashlib.blake2b(user_id.encode("utf-8"), digest_size=8, key=self.salt).hexdigest()
+
+    def _open_segment(self):
+        stamp = time.strftime("%Y%m%dT%H%M%S")
+        self._path = os.path.join(self.directory, f"turns-{stamp}-{os.getpid()}-{_STATS['segments']:05d}.jsonl.open")
+        self._file = open(self._path, "a", encoding="utf-8")
+        _STATS["segments"] += 1
+
+    def _close_segment(self):
+        if self._file is None:
+            return
+        self._file.close()
+        os.replace(self._path, self._path[: -len(".open")])
+        self._file = None
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = False
+            for record in batch:
+                if record is _STOP:
+                    stop = True
+                    continue
+                record["user"] = self._hash_user(record.pop("user_id"))
+                if self._file is None:
+                    self._open_segment()
+                self._file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                _STATS["logged"] += 1
+                if self._file.tell() >= self.segment_bytes:
+                    self._close_segment()
+            if self._file is not None:
+                self._file.flush()
+            if stop:
+                self._close_segment()
+                return
+
+
+_writer = None
+if config.TURN_LOG_ENABLED:
+    _writer = _TurnLogWriter(
+        config.TURN_LOG_DIR,
+        config.TURN_LOG_QUEUE_SIZE,
+        config.TURN_LOG_SEGMENT_BYTES,
+        config.TURN_LOG_SALT,
+    )
+    atexit.register(_writer.close)
+
+
+def log_turn(user_id: str, message: str, slots_before: dict, slots_after: dict,
+             awaiting_before, calls: list, reply, elapsed_ms: float, **extra):
+    """Enqueue one turn record. Never blocks and never raises on a full queue."""
+    if _writer is None:
+        return
+    record = {
+        "ts": time.time(),
+        "user_id": user_id,
+        "message": message,
+        "awaiting": awaiting_before,
+        "slots_before": slots_before,
+        "slots_after": slots_after,
+        "calls": calls,
+        "reply": reply,
+        "ms": round(elapsed_ms, 3),
+    }
+    if extra:
+        record.update(extra)
+    _writer.put(record)
+
+
+def get_stats() -> dict:
+    stats = dict(_STATS)
+    stats["queue_depth"] = _writer.queue.qsize() if _writer is not None else 0
+    return stats
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# 3) Offline readers
+# ────────────────────────────────────────────────────────────────────────────────
+def closed_segments(directory: str = None) -> list:
+    """Finished segments, oldest first (the active '.open' one is excluded)."""
+    return sorted(glob.glob(os.path.join(directory or config.TURN_LOG_DIR, "turns-*.jsonl")))
+
+
+def iter_turns(paths):
+    """Yield turn records from JSONL segments, skipping truncated lines."""
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+
+def compact(out_path: str, directory: str = None, delete: bool = False):
+    """
+    Flatten closed segments into one Parquet file (one row per turn, slots as
+    'before.*' / 'after.*' columns, validator calls as a JSON string column).
+    """
+    import pandas as pd
+
+    paths = closed_segments(directory)
+    if not paths:
+        print("Aucun segment à compacter.")
+        return None
+
+    rows = []
+    for rec in iter_turns(paths):
+        calls = rec.get("calls") or []
+        row = {k: v for k, v in rec.items() if k not in ("slots_before", "slots_after", "calls")}
+        row.update({f"before.{k}": v for k, v in (rec.get("slots_before") or {}).items()})
+        row.update({f"after.{k}": v for k, v in (rec.get("slots_after") or {}).items()})
+        row["n_calls"] = len(calls)
+        row["gemini_calls"] = sum(1 for c in calls if c["source"] == "gemini")
+        row["validators_ms"] = sum(c["ms"] for c in calls)
+        row["calls"] = json.dumps(calls, ensure_ascii=False, default=str)
+        rows.append(row)
+
+    df = pd.DataFrame(rows)
+    df["ts"] = pd.to_datetime(df["ts"], unit="s")
+    df.to_parquet(out_path, index=False)
+    print(f"✅ {len(df)} tours ({len(paths)} segments) → {out_path}")
+
+    if delete:
+        for path in paths:
+            os.remove(path)
+    return out_path
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    if not args or args[0] != "compact":
+        print("Usage: python -m app.core.turn_log compact [out.parquet] [--delete]")
+        sys.exit(1)
+    out = args[1] if len(args) > 1 else os.path.join(
+        config.TURN_LOG_DIR, f"turns-{time.strftime('%Y%m%dT%H%M%S')}.parquet"
+    )
+    compact(out, delete="--delete" in sys.argv)
@@ -1,5 +1,8 @@
 from fastapi import FastAPI
 from app.api.routes_chat import router as chat_router
+from app.api.routes_search import router as search_router
+from app.api.routes_procedures import router as procedures_router
+from app.api.routes_health import router as health_router
 
 app = FastAPI(
     title="Chatbot RNE",
@@ -8,6 +11,9 @@ app = FastAPI(
 )
 
 app.include_router(chat_router, prefix="/api")
+app.include_router(search_router, prefix="/api")
+app.include_router(procedures_router, prefix="/api")
+app.include_router(health_router, prefix="/api")
 
 @app.get("/")
 def read_root():
@@ -0,0 +1,79 @@
+# app/services/answer_table.py
+"""
+Immutable table of pre-rendered "documents" answers.
+
+For the documents branch the final answer depends only on
+(type_ent, intent, update_action), so every answer the catalog can produce is
+rendered once when the catalog is (re)loaded. The table carries a content
+hash that changes whenever any answer text changes.
+"""
+
+import hashlib
+from types import MappingProxyType
+
+from app.core.catalog import fold_key
+
+
+def documents_key(type_ent: str, intent: str, update_action: str = None) -> tuple:
+    """Folded lookup key; update_action only matters for 'mise à jour'."""
+    intent_key = fold_key(intent)
+    action_key = fold_key(update_action) if intent_key == "mise a jour" and update_action else None
+    return fold_key(type_ent), intent_key, action_key
+
+
+class AnswerTable:
+    __slots__ = ("_answers", "_empty", "_labels", "content_hash")
+
+    def __init__(self, answers: dict, empty: set, labels: dict = None):
+        self._answers = MappingProxyType(dict(answers))
+        self._empty = frozenset(empty)
+        # key → (type_ent, intent, update_action) as spelled in the catalog
+        self._labels = MappingProxyType(dict(labels or {}))
+        digest = hashlib.sha256()
+        for key in sorted(answers, key=repr):
+            digest.update(repr(key).encode("utf-8"))
+            digest.update(answers[key].encode("utf-8"))
+        self.content_hash = digest.hexdigest()[:16]
+
+    def __len__(self) -> int:
+        return len(self._answers)
+
+    def get(self, type_ent: str, intent: str, update_action: str = None):
+        return self._answers.get(documents_key(type_ent, intent, update_action))
+
+    def missing(self, combinations) -> list:
+        """Combinations with no entry, or whose entry lists no documents."""
+        result = []
+        for combo in combinations:
+            key = documents_key(*combo)
+            if key not in self._answers or key in self._empty:
+                result.append(combo)
+        return result
+
+    def unreachable(self, combinations) -> list:
+        """Catalog spellings of the entries no combination looks up."""
+        reached = {documents_key(*combo) for combo in combinations}
+        return [self._labels.get(key, key) for key in self._answers if key not in reached]
+
+
+def build_documents_table(catalog, render) -> AnswerTable:
+    """
+    Render every catalog entry with render(type_ent, intent, update_action, docs).
+    Entries whose procedure is 'Création' are creation answers; every other
+    procedure name is an update action. The first entry for a key wins.
+    """
+    answers, empty, labels = {}, set(), {}
+    for entry in catalog.entries:
+        if fold_key(entry.procedure) == "creation":
+            intent, update_action = "création", None
+        else:
+            intent, update_action = "mise à jour", entry.procedure
+        key = documents_key(entry.type_ent, intent, update_action)
+        if key in answers:
+            continue
+        docs = catalog.texts(entry, "documents_demandes")
+        if not docs:
+            empty.add(key)
+        answers[key] = render(entry.type_ent, intent, update_action, docs)
+        labels[key] = (entry.type_ent, intent, update_action)
+    return AnswerTable(answers, empty, labels)
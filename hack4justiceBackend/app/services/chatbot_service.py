@@ -2,15 +2,24 @@
 
 import json
 import re
-from datetime import datetime, timedelta
+import time
+from datetime import datetime
 
 from app.core.session_memory import (
     get_user_state,
     update_user_slot,
     set_awaiting_slot,
-    reset_session
+    reset_session,
+    session_lock
 )
 from app.core.gemini_client import ask_gemini
+from app.core import turn_log
+from app.core import deadline as deadlines
+from app.core.deadline import Deadline
+from app.core.catalog import get_catalog, register_reload_hook
+from app.services.answer_table import build_documents_table
+from app.services.intent_service import classify
+from app.services.procedure_service import compute_penalty
 
 # ────────────────────────────────────────────────────────────────────────────────
 # 1) Load the flow definitions (unchanged)
@@ -20,9 +29,7 @@ with open("app/data/flow_definitions.json", "r", encoding="utf-8") as f:
 
 print(">>> Loaded FLOW (type={}):\n{}".format(type(FLOW), FLOW))
 
-# 2) Load scraped_data.json for final lookup (unchanged)
-with open("app/data/scraped_data.json", "r", encoding="utf-8") as f:
-    SCRAPED = json.load(f)
+# 2) scraped_data.json for final lookup is loaded (interned) by app.core.catalog
 
 # ────────────────────────────────────────────────────────────────────────────────
 # 3) Define the exact lists for creation vs mise à jour (unchanged)
@@ -64,61 +71,156 @@ MISE_A_JOUR_TYPES = [
     "Sociétés"
 ]
 
-UPDATE_ACTIONS = [
-    "Désignation des dirigeants",
-    "Désignation/changement/renouvellement du mandat du réviseur aux comptes",
-    "Transfert du siège",
-    "Dépôt des états financiers",
-    "Désignation/changement/renouvellement du mandat du commissaire aux comptes",
-    "Désignation / changement des dirigeants",
-    "Transfert du siège ou de filiale",
-    "Changement du nom de l'association",
-    "Changement des objectifs",
-    "Mise à jour des statuts",
-    "Ouverture d'une filiale",
-    "Fermeture d'une filiale",
-    "Fusion des associations",
-    "Dissolution/liquidation de l'association",
-    "Radiation du registre",
-    "Changement de dénomination sociale ou du nom commercial ou de l'enseigne",
-    "Mise à jour de l'activité",
-    "Transfert du siège social",
-    "Changement d'adresse d'une filiale",
-    "Désignation /changement /renouvellement du mandat des dirigeants",
-    "Désignation/changement/renouvellement du mandat du commissaire aux comptes",
-    "Dépôt des états financiers consolidés",
-    "Mise à jour des associés ou actionnaires",
-    "Cession des parts /actions",
-    "Transformation de la forme juridique",
-    "Augmentation du capital (les sociétés à responsabilité limité/ sociétés de personnes)",
-    "Dépôt du rapport du commissaire aux apports en nature en cas d'augmentation du capital",
-    "Augmentation du capital (les sociétés anonymes)",
-    "Augmentation du capital (les sociétés civiles)",
-    "Réduction du capital (les sociétés anonymes)",
-    "Réduction du capital (les sociétés civiles)",
-    "Réduction du capital (les sociétés à responsabilité limitée / Sociétés de personnes)",
-    "Dépôt du projet de fusion des sociétés",
-    "Fusion des sociétés",
-    "Dépôt du projet de scission",
-    "Scission des sociétés",
-    "Ajout ou changement du compte bancaire",
-    "Dépôt d'un contrat d'achat/location/gérance libre d'un fonds de commerce",
-    "La cessation temporaire de l'activité / reprise de l'activité",
-    "Prorogation de la durée de la société",
-    "Changement de la date de clôture de l'exercice comptable",
-    "Dissolution et liquidation de la société",
-    "Désignation/renouvellement mandat/changement du liquidateur",
-    "Dépôt d’une autorisation d'agir en faveur de l'un des liquidateurs en cas de pluralité",
-    "Dépôt des états financiers de liquidation",
-    "L'avis de clôture de la liquidation",
-    "Radiation du registre",
-    "Dépôt du PV de l'approbation des états financiers"
-]
+# Update actions offered for each MISE_A_JOUR_TYPES entry, in catalog order
+UPDATE_ACTIONS_BY_TYPE = {
+    "Etablissement Public": [
+        "Désignation des dirigeants",
+        "Désignation/changement/renouvellement du mandat du réviseur aux comptes",
+        "Transfert du siège",
+        "Dépôt des états financiers",
+    ],
+    "Association": [
+        "Dépôt des états financiers",
+        "Désignation/changement/renouvellement du mandat du commissaire aux comptes",
+        "Désignation / changement des dirigeants",
+        "Transfert du siège ou de filiale",
+        "Changement du nom de l'association",
+        "Changement des objectifs",
+        "Mise à jour des statuts",
+        "Ouverture d'une filiale",
+        "Fermeture d'une filiale",
+        "Fusion des associations",
+        "Dissolution/liquidation de l'association",
+        "Radiation du registre",
+    ],
+    "Sociétés": [
+        "Changement de dénomination sociale ou du nom commercial ou de l'enseigne",
+        "Mise à jour de l'activité",
+        "Transfert du siège social",
+        "Ouverture d'une filiale",
+        "Changement d'adresse d'une filiale",
+        "Désignation /changement /renouvellement du mandat des dirigeants",
+        "Désignation/changement/renouvellement du mandat du commissaire aux comptes",
+        "Dépôt des états financiers",
+        "Dépôt des états financiers consolidés",
+        "Mise à jour des associés ou actionnaires",
+        "Cession des parts /actions",
+        "Transformation de la forme juridique",
+        "Augmentation du capital (les sociétés à responsabilité limité/ sociétés de personnes)",
+        "Dépôt du rapport du commissaire aux apports en nature en cas d'augmentation du capital",
+        "Augmentation du capital (les sociétés anonymes)",
+        "Augmentation du capital (les sociétés civiles)",
+        "Réduction du capital (les sociétés anonymes)",
+        "Réduction du capital (les sociétés civiles)",
+        "Réduction du capital (les sociétés à responsabilité limitée / Sociétés de personnes)",
+        "Dépôt du projet de fusion des sociétés",
+        "Fusion des sociétés",
+        "Dépôt du projet de scission",
+        "Scission des sociétés",
+        "Ajout ou changement du compte bancaire",
+        "Dépôt d'un contrat d'achat/location/gérance libre d'un fonds de commerce",
+        "La cessation temporaire de l'activité / reprise de l'activité",
+        "Prorogation de la durée de la société",
+        "Changement de la date de clôture de l'exercice comptable",
+        "Dissolution et liquidation de la société",
+        "Désignation/renouvellement mandat/changement du liquidateur",
+        "Dépôt d’une autorisation d'agir en faveur de l'un des liquidateurs en cas de pluralité",
+        "Dépôt des états financiers de liquidation",
+        "L'avis de clôture de la liquidation",
+        "Radiation du registre",
+        "Dépôt du PV de l'approbation des états financiers",
+    ],
+}
+
+UPDATE_ACTIONS = list(dict.fromkeys(
+    action for actions in UPDATE_ACTIONS_BY_TYPE.values() for action in actions
+))
+
+# ────────────────────────────────────────────────────────────────────────────────
+# 3b) Precomputed answers for the documents branch (rebuilt on catalog reload)
+# ────────────────────────────────────────────────────────────────────────────────
+DOCUMENT_ANSWERS = None
+
+
+def _render_documents_answer(type_ent: str, intent: str, update_action, docs_list: list) -> str:
+    procedure = intent if update_action is None else f"{intent} ({update_action})"
+    if not docs_list:
+        return (
+            f"Désolé, je n'ai pas trouvé la liste des documents requis pour une {type_ent} en cas de {procedure}."
+        )
+    docs_str = ", ".join(docs_list)
+    return (
+        f"Voici les documents requis pour une {type_ent} en cas de {procedure} :\n{docs_str}"
+    )
+
+
+def _reachable_documents_combinations():
+    for type_ent in CREATION_TYPES:
+        yield type_ent, "création", None
+    for type_ent, actions in UPDATE_ACTIONS_BY_TYPE.items():
+        for action in actions:
+            yield type_ent, "mise à jour", action
+
+
+def _rebuild_document_answers(catalog):
+    """
+    Render the documents table and flag data defects: reachable slot
+    combinations with no documents, and catalog entries no combination reaches.
+    """
+    global DOCUMENT_ANSWERS
+    table = build_documents_table(catalog, _render_documents_answer)
+    reachable = list(_reachable_documents_combinations())
+    missing = table.missing(reachable)
+    unreachable = table.unreachable(reachable)
+    print(f">>> Precomputed {len(table)} documents answers (hash {table.content_hash})")
+    print(f">>> Self-check: {len(missing)} reachable combination(s) without documents")
+    for type_ent, intent, action in missing:
+        print(f"    ⚠️ {type_ent} / {intent}" + (f" / {action}" if action else ""))
+    print(f">>> Self-check: {len(unreachable)} catalog answer(s) no slot combination can reach")
+    for type_ent, intent, action in unreachable:
+        print(f"    ⚠️ {type_ent} / {intent}" + (f" / {action}" if action else ""))
+    DOCUMENT_ANSWERS = table
+
+
+register_reload_hook(_rebuild_document_answers)
 
 # ────────────────────────────────────────────────────────────────────────────────
 # 4) Main orchestrator: handle_chat_turn
 # ────────────────────────────────────────────────────────────────────────────────
-def handle_chat_turn(user_id: str, user_input: str) -> str:
+def handle_chat_turn(user_id: str, user_input: str, deadline: Deadline = None, turn_id: str = None) -> str:
+    """
+    Run one turn within `deadline` (a fresh CHAT_TURN_BUDGET_SECONDS budget if
+    none is given) and hand a record of it to the (non-blocking) turn log.
+    Turns of the same user_id run one at a time; other users are not blocked.
+    Waiting for the previous turn is bounded by the deadline (SessionBusy).
+    """
+    deadline = deadline or Deadline()
+    started = time.perf_counter()
+    calls = turn_log.begin_turn()
+    with session_lock(user_id, deadline.remaining()) as lock_wait_ms:
+        state = get_user_state(user_id)
+        slots_before = dict(state["slots"])
+        awaiting_before = state["awaiting_slot"]
+        reply = None
+        try:
+            reply = _run_chat_turn(user_id, user_input, deadline)
+            return reply
+        finally:
+            overrun = deadlines.record_turn(deadline)
+            if overrun:
+                print(f"    ⚠️ Turn budget exceeded ({deadline.elapsed_ms():.0f} ms).")
+            # `state` survives reset_session(), so it still holds the final slots.
+            turn_log.log_turn(
+                user_id, user_input, slots_before, dict(state["slots"]),
+                awaiting_before, calls, reply,
+                (time.perf_counter() - started) * 1000,
+                budget_overrun=overrun,
+                turn_id=turn_id,
+                lock_wait_ms=round(lock_wait_ms, 3),
+            )
+
+
+def _run_chat_turn(user_id: str, user_input: str, deadline: Deadline) -> str:
     state = get_user_state(user_id)
     slots = state["slots"]
     awaiting = state["awaiting_slot"]
@@ -134,9 +236,14 @@ def handle_chat_turn(user_id: str, user_input: str) -> str:
     if awaiting is not None:
         slot_def = next(s for s in FLOW if s["slot_key"] == awaiting)
         print(f">>> Validating slot '{awaiting}'…")
-        valid, extracted_value = _validate_and_extract_slot(awaiting, user_input)
+        # never skipped: without it the conversation could not progress
+        valid, extracted_value = _validate_and_extract_slot(
+            user_id, awaiting, user_input, deadline.for_required_call())
         print(f"    Validation for '{awaiting}': valid={valid}, value={extracted_value!r}")
 
+        if valid is None:
+            # Several candidates: ask the user to pick one (same slot stays awaited)
+            return get_user_state(user_id).pop("last_follow_up", slot_def["retry_prompt"])
         if not valid:
             # Ask the retry prompt for that slot
             return slot_def["retry_prompt"]
@@ -147,7 +254,7 @@ def handle_chat_turn(user_id: str, user_input: str) -> str:
 
         # Re‐extract any other slots from the same message
         print("    Re‐extracting other slots from this message…")
-        _extract_slots_from_free_form(user_id, user_input)
+        _extract_slots_from_free_form(user_id, user_input, deadline)
 
         slots = get_user_state(user_id)["slots"]
         print(f"    Slots after re‐extraction: {slots}")
@@ -155,7 +262,7 @@ def handle_chat_turn(user_id: str, user_input: str) -> str:
     else:
         # ── B) Free‐form extraction for missing slots ───────────────────────────────
         print(">>> Free‐form extraction for missing slots…")
-        _extract_slots_from_free_form(user_id, user_input)
+        _extract_slots_from_free_form(user_id, user_input, deadline)
         slots = get_user_state(user_id)["slots"]
         print(f"    Slots after free‐form extraction: {slots}")
 
@@ -179,16 +286,16 @@ def handle_chat_turn(user_id: str, user_input: str) -> str:
 # ────────────────────────────────────────────────────────────────────────────────
 # 5) Slot validation helpers, with updated intent logic
 # ────────────────────────────────────────────────────────────────────────────────
-def _validate_and_extract_slot(slot_key: str, user_input: str):
+def _validate_and_extract_slot(user_id: str, slot_key: str, user_input: str, deadline=None):
     normalized = user_input.strip()
-    state = get_user_state(user_id=None)  # assumes global or closure provides user_id if needed
+    state = get_user_state(user_id)
 
     print(f"    [_validate_and_extract_slot] slot_key={slot_key}, input={normalized!r}")
 
     if slot_key == "intent_type":
-        print("    → Calling Gemini for 'classify_intent'…")
-        parsed = ask_gemini("classify_intent", user_input)
-        print(f"    → Gemini returned: {parsed}")
+        print("    → Classifying 'classify_intent' (local model, Gemini fallback)…")
+        parsed = classify("classify_intent", user_input, deadline)
+        print(f"    → Classifier returned: {parsed}")
         intent = parsed.get("intent_type")
         if intent in ["création", "mise à jour"]:
             return True, intent
@@ -196,54 +303,49 @@ def _validate_and_extract_slot(slot_key: str, user_input: str):
         return False, None
 
     elif slot_key == "type_ent":
-        candidates = state.get("awaiting_details", [])
+        candidates = state.pop("awaiting_details", None)
         if candidates:
-            # User must choose from existing candidates
+            # User must choose from the candidates we listed
             for cand in candidates:
                 if normalized.lower() == cand.lower():
                     return True, cand
-            # Ask Gemini to pick from candidates
-            prompt = (
-                f"L’utilisateur a précisé : '{user_input}'.\n"
-                f"Parmi ces options, choisis l’unique type : {candidates}\n"
-                "Réponds uniquement en JSON : { \"chosen\": \"<valeur_exacte>\" }"
-            )
-            parsed = ask_gemini_custom(prompt)  # implement a simple wrapper if needed
-            chosen = parsed.get("chosen", "").strip()
+            print("    → Calling Gemini for 'choose_type_ent_candidate'…")
+            parsed = ask_gemini("choose_type_ent_candidate", user_input, deadline,
+                                {"<CANDIDATES>": json.dumps(candidates, ensure_ascii=False)})
+            chosen = parsed.get("chosen")
             for cand in candidates:
-                if chosen.lower() == cand.lower():
+                if isinstance(chosen, str) and chosen.strip().lower() == cand.lower():
                     return True, cand
-            return False, None
+            print("    → Aucun candidat choisi ; nouvelle recherche dans la liste complète.")
+        # First match (or the user rephrased): depending on intent, call appropriate prompt
+        intent = state["slots"].get("intent_type")
+        if intent == "création":
+            prompt_key = "match_type_ent_creation"
         else:
-            # First time match: depending on intent, call appropriate prompt
-            intent = state["slots"].get("intent_type")
-            if intent == "création":
-                prompt_key = "match_type_ent_creation"
-            else:
-                prompt_key = "match_type_ent_mise_a_jour"
-            print(f"    → Calling Gemini for '{prompt_key}'…")
-            parsed = ask_gemini(prompt_key, user_input)
-            print(f"    → Gemini returned: {parsed}")
-            candidates = parsed.get("candidates", [])
-            if not isinstance(candidates, list) or len(candidates) == 0:
-                print("    → Aucun candidat trouvé par Gemini pour type_ent.")
-                return False, None
-            if len(candidates) == 1:
-                return True, candidates[0].strip()
-            # Multiple candidates: store and ask user to clarify
-            state["awaiting_details"] = candidates
-            follow_up = (
-                f"J’ai identifié plusieurs types d’entités possibles : {', '.join(candidates)}.\n"
-                "Lequel correspond le mieux à ton cas ?"
-            )
-            set_awaiting_slot(state["user_id"], "type_ent")
-            state["last_follow_up"] = follow_up
-            return None, None  # indicate that follow-up must be sent
+            prompt_key = "match_type_ent_mise_a_jour"
+        print(f"    → Calling Gemini for '{prompt_key}'…")
+        parsed = ask_gemini(prompt_key, user_input, deadline)
+        print(f"    → Gemini returned: {parsed}")
+        candidates = parsed.get("candidates", [])
+        if not isinstance(candidates, list) or len(candidates) == 0:
+            print("    → Aucun candidat trouvé par Gemini pour type_ent.")
+            return False, None
+        if len(candidates) == 1:
+            return True, candidates[0].strip()
+        # Multiple candidates: store and ask user to clarify
+        state["awaiting_details"] = candidates
+        follow_up = (
+            f"J’ai identifié plusieurs types d’entités possibles : {', '.join(candidates)}.\n"
+            "Lequel correspond le mieux à ton cas ?"
+        )
+        set_awaiting_slot(user_id, "type_ent")
+        state["last_follow_up"] = follow_up
+        return None, None  # indicate that follow-up must be sent
 
     elif slot_key == "needs_documents_or_penalty":
-        print("    → Calling Gemini for 'one_of_documents_or_penalty'…")
-        parsed = ask_gemini("one_of_documents_or_penalty", user_input)
-        print(f"    → Gemini returned: {parsed}")
+        print("    → Classifying 'one_of_documents_or_penalty' (local model, Gemini fallback)…")
+        parsed = classify("one_of_documents_or_penalty", user_input, deadline)
+        print(f"    → Classifier returned: {parsed}")
         choice = parsed.get("choice", "")
         if choice in ["documents", "amende"]:
             return True, choice
@@ -251,15 +353,15 @@ def _validate_and_extract_slot(slot_key: str, user_input: str):
 
     elif slot_key == "creation_date":
         print("    → Calling Gemini for 'valid_date_string'…")
-        parsed = ask_gemini("valid_date_string", user_input)
+        parsed = ask_gemini("valid_date_string", user_input, deadline)
         print(f"    → Gemini returned: {parsed}")
-        if parsed.get("error") == "invalid_date":
+        if "date" not in parsed:  # invalid_date, or the call was skipped / timed out
             return False, None
         return True, parsed["date"]
 
     elif slot_key == "update_action":
         print("    → Calling Gemini for 'choose_update_action'…")
-        parsed = ask_gemini("choose_update_action", user_input)
+        parsed = ask_gemini("choose_update_action", user_input, deadline)
         print(f"    → Gemini returned: {parsed}")
         action = parsed.get("update_action", "").strip()
         for ua in UPDATE_ACTIONS:
@@ -273,7 +375,7 @@ def _validate_and_extract_slot(slot_key: str, user_input: str):
         return False, None
 
 
-def _extract_slots_from_free_form(user_id: str, user_input: str):
+def _extract_slots_from_free_form(user_id: str, user_input: str, deadline=None):
     state = get_user_state(user_id)
     slots = state["slots"]
     intent = slots.get("intent_type")
@@ -281,9 +383,9 @@ def _extract_slots_from_free_form(user_id: str, user_input: str):
 
     # --- 1) intent_type ---
     if intent is None:
-        print("    → intent_type is missing. Calling Gemini…")
-        parsed = ask_gemini("classify_intent", user_input)
-        print(f"    → Gemini classify_intent returned: {parsed}")
+        print("    → intent_type is missing. Classifying…")
+        parsed = classify("classify_intent", user_input, deadline)
+        print(f"    → classify_intent returned: {parsed}")
         found_intent = parsed.get("intent_type")
         if found_intent in ["création", "mise à jour"]:
             print(f"    → Storing intent_type = {found_intent!r}")
@@ -302,7 +404,7 @@ def _extract_slots_from_free_form(user_id: str, user_input: str):
     if intent in ["création", "mise à jour"] and slots.get("type_ent") is None:
         print("    → type_ent is missing; calling Gemini…")
         # Gemini logic inside _validate_and_extract_slot will store follow-up if needed
-        valid, extracted = _validate_and_extract_slot("type_ent", user_input)
+        valid, extracted = _validate_and_extract_slot(user_id, "type_ent", user_input, deadline)
         if valid:
             print(f"    → Storing type_ent = {extracted!r}")
             update_user_slot(user_id, "type_ent", extracted)
@@ -318,9 +420,9 @@ def _extract_slots_from_free_form(user_id: str, user_input: str):
 
     # --- 3) needs_documents_or_penalty ---
     if slots.get("needs_documents_or_penalty") is None:
-        print("    → needs_documents_or_penalty is missing; calling Gemini…")
-        parsed = ask_gemini("one_of_documents_or_penalty", user_input)
-        print(f"    → Gemini returned: {parsed}")
+        print("    → needs_documents_or_penalty is missing; classifying…")
+        parsed = classify("one_of_documents_or_penalty", user_input, deadline)
+        print(f"    → Classifier returned: {parsed}")
         doc_choice = parsed.get("choice", "").strip()
         if doc_choice in ["documents", "amende"]:
             print(f"    → Storing needs_documents_or_penalty = {doc_choice}")
@@ -341,9 +443,9 @@ def _extract_slots_from_free_form(user_id: str, user_input: str):
         if date_match:
             candidate = date_match.group(1)
             print(f"    → Found date pattern '{candidate}'; validating via Gemini…")
-            parsed = ask_gemini("valid_date_string", candidate)
+            parsed = ask_gemini("valid_date_string", candidate, deadline)
             print(f"    → Gemini returned for valid_date_string: {parsed}")
-            if parsed.get("error") != "invalid_date":
+            if "date" in parsed:
                 dt = parsed["date"]
                 print(f"    → Storing creation_date = {dt}")
                 update_user_slot(user_id, "creation_date", dt)
@@ -360,7 +462,7 @@ def _extract_slots_from_free_form(user_id: str, user_input: str):
     # --- 5) update_action ---
     if intent == "mise à jour" and slots.get("update_action") is None:
         print("    → update_action is missing and intent is 'mise à jour'; calling Gemini…")
-        parsed = ask_gemini("choose_update_action", user_input)
+        parsed = ask_gemini("choose_update_action", user_input, deadline)
         print(f"    → Gemini returned for choose_update_action: {parsed}")
         action = parsed.get("update_action", "").strip()
         for ua in UPDATE_ACTIONS:
@@ -375,7 +477,7 @@ def _extract_slots_from_free_form(user_id: str, user_input: str):
 # ────────────────────────────────────────────────────────────────────────────────
 # In your _extract_slots_from_free_form helper:
 # ────────────────────────────────────────────────────────────────────────────────
-def _extract_slots_from_free_form(user_id: str, user_input: str):
+def _extract_slots_from_free_form(user_id: str, user_input: str, deadline=None):
     state = get_user_state(user_id)
     slots = state["slots"]
     intent = slots["intent_type"]
@@ -383,9 +485,9 @@ def _extract_slots_from_free_form(user_id: str, user_input: str):
 
     # --- 1) intent_type — only if missing (None). unchanged. ---
     if intent is None:
-        print("    → intent_type is missing. Calling Gemini…")
-        parsed = ask_gemini("classify_intent", user_input)
-        print(f"    → Gemini classify_intent returned: {parsed}")
+        print("    → intent_type is missing. Classifying…")
+        parsed = classify("classify_intent", user_input, deadline)
+        print(f"    → classify_intent returned: {parsed}")
         found_intent = parsed.get("intent_type")
         if found_intent in ["création", "mise à jour"]:
             print(f"    → Storing intent_type = {found_intent!r}")
@@ -402,7 +504,7 @@ def _extract_slots_from_free_form(user_id: str, user_input: str):
     # --- 2) type_ent — only if missing and intent is valid. Always use Gemini’s 'match_type_ent' ---
     if intent in ["création", "mise à jour"] and slots["type_ent"] is None:
         print("    → type_ent is missing; calling Gemini for 'match_type_ent'…")
-        parsed = ask_gemini("match_type_ent", user_input)
+        parsed = ask_gemini("match_type_ent", user_input, deadline)
         print(f"    → Gemini returned for match_type_ent: {parsed}")
         chosen = parsed.get("type_ent", "").strip()
 
@@ -424,9 +526,9 @@ def _extract_slots_from_free_form(user_id: str, user_input: str):
 
     # --- 3) needs_documents_or_penalty — only if missing (unchanged) ---
     if slots["needs_documents_or_penalty"] is None:
-        print("    → needs_documents_or_penalty is missing; calling Gemini…")
-        parsed = ask_gemini("one_of_documents_or_penalty", user_input)
-        print(f"    → Gemini returned for one_of_documents_or_penalty: {parsed}")
+        print("    → needs_documents_or_penalty is missing; classifying…")
+        parsed = classify("one_of_documents_or_penalty", user_input, deadline)
+        print(f"    → one_of_documents_or_penalty returned: {parsed}")
         doc_choice = parsed.get("choice", "").strip()
         if doc_choice in ["documents", "amende"]:
             print(f"    → Storing needs_documents_or_penalty = {doc_choice}")
@@ -446,9 +548,9 @@ def _extract_slots_from_free_form(user_id: str, user_input: str):
         if date_match:
             candidate = date_match.group(1)
             print(f"    → Found date pattern '{candidate}'; validating via Gemini…")
-            parsed = ask_gemini("valid_date_string", candidate)
+            parsed = ask_gemini("valid_date_string", candidate, deadline)
             print(f"    → Gemini returned for valid_date_string: {parsed}")
-            if parsed.get("error") != "invalid_date":
+            if "date" in parsed:
                 dt = parsed["date"]
                 print(f"    → Storing creation_date = {dt}")
                 update_user_slot(user_id, "creation_date", dt)
@@ -464,7 +566,7 @@ def _extract_slots_from_free_form(user_id: str, user_input: str):
     # --- 5) update_action — only if intent == 'mise à jour' and missing (unchanged) ---
     if intent == "mise à jour" and slots["update_action"] is None:
         print("    → update_action is missing and intent is 'mise à jour'; calling Gemini…")
-        parsed = ask_gemini("choose_update_action", user_input)
+        parsed = ask_gemini("choose_update_action", user_input, deadline)
         print(f"    → Gemini returned for choose_update_action: {parsed}")
         action = parsed.get("update_action", "").strip()
         for ua in UPDATE_ACTIONS:
@@ -504,43 +606,33 @@ def _find_next_missing_slot(slots: dict) -> str or None:
 
 def _compute_final_answer_using_scraped_data(slots: dict) -> str:
     """
-    (Unchanged) Once all slots are valid, look up scraped_data.json and return the answer.
+    Once all slots are valid, return the answer: a lookup in the precomputed
+    documents table, or the penalty computed from the matching catalog entry.
+    For 'mise à jour' the entry's procedure is the chosen update_action.
     """
     intent = slots["intent_type"]
     type_ent = slots["type_ent"]
     choice = slots["needs_documents_or_penalty"]
+    update_action = slots.get("update_action") if intent == "mise à jour" else None
+    procedure = update_action or intent
 
     print(f"    [_compute_final_answer_using_scraped_data] intent={intent}, type_ent={type_ent}, choice={choice}")
 
-    # 1) Find matching scraped_data entry
-    matched_entry = None
-    for entry in SCRAPED:
-        if (
-            entry["type_ent"].lower().strip() == type_ent.lower().strip()
-            and entry["procedure"].lower().strip() == intent.lower().strip()
-        ):
-            matched_entry = entry
-            break
+    not_found = (
+        f"Désolé, je n'ai pas trouvé d'informations pour le type d'entité « {type_ent} » "
+        f"et la procédure « {procedure} »."
+    )
 
-    if not matched_entry:
-        return (
-            f"Désolé, je n'ai pas trouvé d'informations pour le type d'entité « {type_ent} » "
-            f"et la procédure « {intent} »."
-        )
-
-    content = matched_entry["json_contents"][0]
-
-    # 2) Documents branch
+    # 1) Documents branch: precomputed at load time
     if choice == "documents":
-        docs_list = content.get("documents_demandes", [])
-        if not docs_list:
-            return (
-                f"Désolé, je n'ai pas trouvé la liste des documents requis pour une {type_ent} en cas de {intent}."
-            )
-        docs_str = ", ".join(docs_list)
-        return (
-            f"Voici les documents requis pour une {type_ent} en cas de {intent} :\n{docs_str}"
-        )
+        answer = DOCUMENT_ANSWERS.get(type_ent, intent, update_action)
+        return answer if answer is not None else not_found
+
+    # 2) Find matching scraped_data entry
+    catalog = get_catalog()
+    matched_entry = catalog.find(type_ent, procedure)
+    if not matched_entry:
+        return not_found
 
     # 3) Penalty branch
     creation_date_str = slots["creation_date"]
@@ -551,36 +643,19 @@ def _compute_final_answer_using_scraped_data(slots: dict) -> str:
             "La date fournie n'est pas valide (JJ/MM/AAAA). Merci de recommencer."
         )
 
-    delais_text = matched_entry.get("delais", "")
-    delay_days = 30
-    if "15 jours" in delais_text:
-        delay_days = 15
-    elif "30 jours" in delais_text:
-        delay_days = 30
-
-    redevance_text = matched_entry.get("redevance", "")
-    fee_match = re.search(r"(\d+)\s*dinars", redevance_text)
-    if fee_match:
-        base_fee = int(fee_match.group(1))
-    else:
-        tnd_match = re.search(r"(\d+)\s*TND", redevance_text)
-        base_fee = int(tnd_match.group(1)) if tnd_match else 0
-
-    date_due = dt_created + timedelta(days=delay_days)
-    today = datetime.today()
+    penalty = compute_penalty(matched_entry, dt_created)
+    delay_days = penalty["delay_days"]
 
-    if today > date_due:
-        days_overdue = (today - date_due).days
-        daily_rate = 5
-        fine = days_overdue * daily_rate
+    if penalty["overdue"]:
+        observations = catalog.texts(matched_entry, "observations")
         return (
             f"La création date du {creation_date_str}. Tu as dépassé le délai de {delay_days} jours. "
-            f"Tu es en retard de {days_overdue} jours. L’amende s’élève à {fine} TND.\n"
-            f"(Détail pénalités : {content['observations'][0]})"
+            f"Tu es en retard de {penalty['days_overdue']} jours. L’amende s’élève à {penalty['fine']} TND.\n"
+            f"(Détail pénalités : {observations[0] if observations else ''})"
         )
     else:
         return (
             f"La création date du {creation_date_str}. Tu es dans le délai de {delay_days} jours. "
-            f"Le tarif normal est de {base_fee} TND.\n"
-            f"(Délai légal : {delais_text})"
+            f"Le tarif normal est de {penalty['base_fee']} TND.\n"
+            f"(Délai légal : {matched_entry.delais})"
         )
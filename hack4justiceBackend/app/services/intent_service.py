@@ -1 +1,258 @@
+# app/services/intent_service.py
+"""
+Small local classifier for the two high-volume labelling decisions
+(classify_intent and one_of_documents_or_penalty).
 
+Messages are turned into hashed word / character n-gram features and scored
+by a multinomial logistic regression trained with NumPy only. When the model
+is confident enough the label is returned directly; otherwise we defer to
+Gemini. Gemini's answers land in the turn log, which is the training set.
+
+    python -m app.services.intent_service train  [turns-*.jsonl ...]
+    python -m app.services.intent_service report [turns-*.jsonl ...]
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+import time
+import unicodedata
+import zlib
+
+import numpy as np
+
+from app.core import config, turn_log
+from app.core.gemini_client import ask_gemini_batched
+
+# validation_type → (JSON key returned by Gemini, labels we accept from the model)
+LOCAL_TASKS = {
+    "classify_intent": ("intent_type", ["création", "mise à jour"]),
+    "one_of_documents_or_penalty": ("choice", ["documents", "amende"]),
+}
+
+N_FEATURES = 1 << 16
+_WORD_RE = re.compile(r"\w+")
+
+_MODELS = {}
+_stats_lock = threading.Lock()
+_STATS = {
+    task: {"local": 0, "gemini": 0, "agree": 0, "disagree": 0}
+    for task in LOCAL_TASKS
+}
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# 1) Features
+# ────────────────────────────────────────────────────────────────────────────────
+def _fold(text: str) -> str:
+    """Lowercase and strip accents so 'Création' and 'creation' hash alike."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def _features(text: str, n_features: int = N_FEATURES):
+    """Return (indices, values) of the L2-normalised hashed feature vector."""
+    words = _WORD_RE.findall(_fold(text))
+    feats = ["__bias__"]
+    feats.extend("w:" + w for w in words)
+    feats.extend("b:" + a + " " + b for a, b in zip(words, words[1:]))
+    for w in words:
+        padded = f" {w} "
+        for n in (3, 4, 5):
+            feats.extend("c:" + padded[i:i + n] for i in range(len(padded) - n + 1))
+
+    counts = {}
+    for f in feats:
+        h = zlib.crc32(f.encode("utf-8")) % n_features
+        counts[h] = counts.get(h, 0.0) + 1.0
+    indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+    values = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+    values /= np.linalg.norm(values)
+    return indices, values
+
+
+def _featurize_batch(texts, n_features: int = N_FEATURES):
+    """Stack per-text features into flat (rows, indices, values) arrays."""
+    rows, indices, values = [], [], []
+    for r, text in enumerate(texts):
+        idx, val = _features(text, n_features)
+        rows.append(np.full(len(idx), r, dtype=np.int64))
+        indices.append(idx)
+        values.append(val)
+    return np.concatenate(rows), np.concatenate(indices), np.concatenate(values)
+
+
+def _softmax(scores):
+    scores = scores - scores.max(axis=-1, keepdims=True)
+    exp = np.exp(scores)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# 2) Training
+# ────────────────────────────────────────────────────────────────────────────────
+def _fit(texts, labels, classes, epochs: int = 300, lr: float = 2.0, l2: float = 1e-4):
+    """Full-batch gradient descent on the softmax cross-entropy."""
+    rows, indices, values = _featurize_batch(texts)
+    y = np.array([classes.index(lbl) for lbl in labels])
+    n, k = len(texts), len(classes)
+    target = np.eye(k, dtype=np.float32)[y]
+    weights = np.zeros((N_FEATURES, k), dtype=np.float32)
+
+    for _ in range(epochs):
+        scores = np.zeros((n, k), dtype=np.float32)
+        np.add.at(scores, rows, weights[indices] * values[:, None])
+        delta = (_softmax(scores) - target) / n
+        grad = np.zeros_like(weights)
+        np.add.at(grad, indices, values[:, None] * delta[rows])
+        grad += l2 * weights
+        weights -= lr * grad
+    return weights
+
+
+def load_labelled_pairs(paths):
+    """
+    Collect (message, Gemini label) pairs per validation type from turn log
+    segments. Later duplicates override earlier ones.
+    """
+    pairs = {task: {} for task in LOCAL_TASKS}
+    for rec in turn_log.iter_turns(paths):
+        for call in rec.get("calls") or []:
+            task = call.get("validator")
+            if task not in pairs or call.get("source") not in ("gemini", "gemini_batch"):
+                continue
+            result = call.get("result")
+            label = result.get(LOCAL_TASKS[task][0]) if isinstance(result, dict) else None
+            if isinstance(label, str) and label:
+                pairs[task][call["input"].strip()] = label
+    return {task: list(p.items()) for task, p in pairs.items()}
+
+
+def train(paths, model_path: str = None):
+    """Train one model per task and save them in a single compressed .npz."""
+    model_path = model_path or config.INTENT_MODEL_PATH
+    arrays, meta = {}, {"n_features": N_FEATURES, "tasks": {}}
+    for task, pairs in load_labelled_pairs(paths).items():
+        classes = sorted({label for _, label in pairs})
+        if len(classes) < 2:
+            print(f"⚠️ {task}: pas assez de données ({len(pairs)} exemples, {len(classes)} classe(s)).")
+            continue
+        texts, labels = zip(*pairs)
+        arrays[f"W_{task}"] = _fit(texts, labels, classes).astype(np.float16)
+        meta["tasks"][task] = {"classes": classes, "n_examples": len(pairs)}
+        print(f"✅ {task}: {len(pairs)} exemples, classes={classes}")
+
+    np.savez_compressed(model_path, meta=np.array(json.dumps(meta)), **arrays)
+    print(f"Model saved → {model_path}")
+    return meta
+
+
+def report(paths, thresholds=(0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 0.99)):
+    """
+    Hold out every 5th message, train on the rest and print, per threshold,
+    how many held-out messages the model would answer alone (coverage) and
+    how often it agrees with Gemini on those (agreement).
+    """
+    for task, pairs in load_labelled_pairs(paths).items():
+        test = [p for p in pairs if zlib.crc32(p[0].encode("utf-8")) % 5 == 0]
+        trainset = [p for p in pairs if zlib.crc32(p[0].encode("utf-8")) % 5 != 0]
+        classes = sorted({label for _, label in trainset})
+        if len(classes) < 2 or not test:
+            print(f"{task}: pas assez de données pour l'évaluation.")
+            continue
+        texts, labels = zip(*trainset)
+        weights = _fit(texts, labels, classes)
+        probs = [_predict_proba(weights, text) for text, _ in test]
+        predicted = [classes[int(p.argmax())] for p in probs]
+        confidence = np.array([p.max() for p in probs])
+        correct = np.array([pred == gold for pred, (_, gold) in zip(predicted, test)])
+
+        print(f"\n{task}: train={len(trainset)} test={len(test)} accuracy={correct.mean():.3f}")
+        print("  threshold  coverage  agreement")
+        for t in thresholds:
+            mask = confidence >= t
+            agreement = correct[mask].mean() if mask.any() else float("nan")
+            print(f"  {t:9.2f}  {mask.mean():8.3f}  {agreement:9.3f}")
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# 3) Inference with Gemini fallback
+# ────────────────────────────────────────────────────────────────────────────────
+def _predict_proba(weights, text: str):
+    indices, values = _features(text, weights.shape[0])
+    return _softmax(values @ weights[indices].astype(np.float32))
+
+
+def load_model(model_path: str = None):
+    """(Re)load the trained artifact; missing file means 'always ask Gemini'."""
+    model_path = model_path or config.INTENT_MODEL_PATH
+    _MODELS.clear()
+    if not os.path.exists(model_path):
+        print(f">>> No local intent model at {model_path}; using Gemini only.")
+        return
+    with np.load(model_path, allow_pickle=False) as data:
+        meta = json.loads(str(data["meta"]))
+        for task, info in meta["tasks"].items():
+            _MODELS[task] = (data[f"W_{task}"].astype(np.float32), info["classes"])
+    print(f">>> Loaded local intent model for {sorted(_MODELS)}")
+
+
+def predict(validation_type: str, user_input: str):
+    """Return (label, confidence) from the local model, or (None, 0.0)."""
+    model = _MODELS.get(validation_type)
+    if model is None:
+        return None, 0.0
+    weights, classes = model
+    probs = _predict_proba(weights, user_input)
+    best = int(probs.argmax())
+    return classes[best], float(probs[best])
+
+
+def classify(validation_type: str, user_input: str, deadline=None) -> dict:
+    """
+    Drop-in replacement for ask_gemini() on LOCAL_TASKS: answers locally when
+    the model is confident, otherwise asks Gemini, batched with concurrent
+    turns (which records the call, and so the training label, in the turn log).
+    """
+    key, accepted = LOCAL_TASKS[validation_type]
+    started = time.perf_counter()
+    label, confidence = predict(validation_type, user_input)
+    if label in accepted and confidence >= config.INTENT_CONFIDENCE_THRESHOLD:
+        with _stats_lock:
+            _STATS[validation_type]["local"] += 1
+        parsed = {key: label, "confidence": confidence}
+        turn_log.record_call(validation_type, "local", user_input, parsed,
+                             (time.perf_counter() - started) * 1000)
+        return parsed
+
+    parsed = ask_gemini_batched(validation_type, user_input, deadline)
+    gemini_label = parsed.get(key)
+    with _stats_lock:
+        stats = _STATS[validation_type]
+        stats["gemini"] += 1
+        if label is not None and gemini_label is not None:
+            stats["agree" if label == gemini_label else "disagree"] += 1
+    return parsed
+
+
+def get_stats() -> dict:
+    """Local vs Gemini counts, and agreement on the messages that were deferred."""
+    with _stats_lock:
+        return {task: dict(s) for task, s in _STATS.items()}
+
+
+load_model()
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "train"
+    label_paths = sys.argv[2:] or turn_log.closed_segments()
+    if command == "train":
+        train(label_paths)
+    elif command == "report":
+        report(label_paths)
+    else:
+        print("Usage: python -m app.services.intent_service [train|report] [turns-*.jsonl ...]")
+        sys.exit(1)
@@ -0,0 +1,101 @@
+# app/services/procedure_service.py
+"""
+Direct lookup of a procedure in the catalog, without a chat session or a
+model call: required documents, legal delay, fee and, given a creation date,
+the late-filing penalty. The penalty rules are shared with the chatbot's
+final answer.
+"""
+
+import re
+from datetime import datetime, timedelta
+
+from app.core.catalog import fold_key, get_catalog
+
+DAILY_FINE_TND = 5
+DATE_FORMATS = ("%d/%m/%Y", "%Y-%m-%d")
+
+
+def parse_creation_date(text: str):
+    """JJ/MM/AAAA (as asked in the chat) or AAAA-MM-JJ; None if invalid."""
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text.strip(), fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def penalty_terms(entry) -> tuple:
+    """(delay in days, base fee in TND) read from the entry's delais / redevance texts."""
+    delay_days = 30
+    if "15 jours" in entry.delais:
+        delay_days = 15
+    elif "30 jours" in entry.delais:
+        delay_days = 30
+
+    fee_match = re.search(r"(\d+)\s*dinars", entry.redevance)
+    if fee_match:
+        base_fee = int(fee_match.group(1))
+    else:
+        tnd_match = re.search(r"(\d+)\s*TND", entry.redevance)
+        base_fee = int(tnd_match.group(1)) if tnd_match else 0
+    return delay_days, base_fee
+
+
+def compute_penalty(entry, created: datetime, today: datetime = None) -> dict:
+    """Due date, days overdue and fine for a filing created on `created`."""
+    delay_days, base_fee = penalty_terms(entry)
+    date_due = created + timedelta(days=delay_days)
+    today = today or datetime.today()
+    overdue = today > date_due
+    days_overdue = (today - date_due).days if overdue else 0
+    return {
+        "delay_days": delay_days,
+        "base_fee": base_fee,
+        "due_date": date_due,
+        "overdue": overdue,
+        "days_overdue": days_overdue,
+        "fine": days_overdue * DAILY_FINE_TND,
+    }
+
+
+def find_procedure(type_ent: str, procedure: str, update_action: str = None):
+    """
+    Catalog entry for a type_ent and either 'création' or 'mise à jour' plus
+    the update action (as in the chat), or directly an update action name.
+    """
+    if fold_key(procedure) == "mise a jour":
+        if not update_action:
+            return None
+        procedure = update_action
+    return get_catalog().find(type_ent, procedure)
+
+
+def describe(entry, created: datetime = None) -> dict:
+    """Everything the API returns for one catalog entry."""
+    catalog = get_catalog()
+    delay_days, base_fee = penalty_terms(entry)
+    result = {
+        "code": entry.code,
+        "type_ent": entry.type_ent,
+        "genre_ent": entry.genre_ent,
+        "procedure": entry.procedure,
+        "documents": catalog.texts(entry, "documents_demandes"),
+        "delay": entry.delais,
+        "delay_days": delay_days,
+        "fee": entry.redevance,
+        "base_fee": base_fee,
+        "observations": catalog.texts(entry, "observations"),
+        "penalty": None,
+        "data_version": catalog.version,
+    }
+    if created is not None:
+        penalty = compute_penalty(entry, created)
+        result["penalty"] = {
+            "creation_date": created.date(),
+            "due_date": penalty["due_date"].date(),
+            "overdue": penalty["overdue"],
+            "days_overdue": penalty["days_overdue"],
+            "fine": penalty["fine"],
+        }
+    return result
@@ -0,0 +1,145 @@
+# app/services/search_service.py
+"""
+Full-text search over the procedure catalog (procedures and required documents).
+
+An in-memory SQLite FTS5 index is built at import time. Text is NFKC-normalised
+(which also maps the Arabic presentation forms found in the PDFs back to base
+letters) and tokenised by unicode61 with diacritics removed, so 'societe'
+finds 'Société'. Results are ranked with BM25; the required-document lines
+that contain a query term are returned alongside each hit (cheaper than
+FTS5 snippet(), which dominated query time).
+
+    python -m app.services.search_service "copie publication JORT"
+"""
+
+import re
+import sqlite3
+import sys
+import threading
+import time
+import unicodedata
+
+from app.core.catalog import CONTENT_FIELDS, register_reload_hook
+
+# Per-column BM25 weights, in table column order (code and procedure first).
+_COLUMNS = [
+    ("code", 10.0),
+    ("type_ent", 4.0),
+    ("procedure", 4.0),
+    ("redevance", 1.0),
+    ("delais", 1.0),
+    ("documents", 2.0),
+    ("delais_docs", 1.0),
+    ("redevances", 1.0),
+    ("observations", 1.0),
+]
+_TOKEN_RE = re.compile(r"\w+")
+
+_conn = None
+_documents = []  # rowid - 1 → [(folded line, original line), ...]
+_lock = threading.Lock()
+
+
+def _normalize(text: str) -> str:
+    return unicodedata.normalize("NFKC", text or "")
+
+
+def _fold(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", _normalize(text).lower())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def build_index(catalog):
+    """
+    Create a fresh in-memory FTS5 table from the catalog entries.
+    Returns (connection, per-entry document lines for match highlighting).
+    """
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    columns = ", ".join(name for name, _ in _COLUMNS)
+    conn.execute(
+        f"CREATE VIRTUAL TABLE procedures USING fts5({columns}, "
+        "tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    rows, documents = [], []
+    for entry in catalog.entries:
+        row = [_normalize(getattr(entry, name)) for name in ("code", "type_ent", "procedure", "redevance", "delais")]
+        # CONTENT_FIELDS is in the same order as the documents..observations columns
+        for field in CONTENT_FIELDS:
+            lines = [
+                _normalize(line)
+                for index in range(len(entry.contents))
+                for line in catalog.texts(entry, field, index)
+            ]
+            row.append("\n".join(lines))
+            if field == "documents_demandes":
+                documents.append([(_fold(line), line) for line in lines])
+        rows.append(row)
+    placeholders = ", ".join("?" for _ in _COLUMNS)
+    conn.executemany(f"INSERT INTO procedures VALUES ({placeholders})", rows)
+    conn.commit()
+    return conn, documents
+
+
+def load_index(catalog):
+    """(Re)build the module-level index; registered as a catalog reload hook."""
+    global _conn, _documents
+    conn, documents = build_index(catalog)
+    with _lock:
+        _conn, _documents = conn, documents
+
+
+def _matching_documents(rowid: int, terms) -> list:
+    """Document lines of the hit containing the most query terms."""
+    scored = [(sum(t in folded for t in terms), line) for folded, line in _documents[rowid - 1]]
+    best = max((n for n, _ in scored), default=0)
+    return [line for n, line in scored if best and n == best]
+
+
+def search(query: str, limit: int = 10) -> list:
+    """
+    Return the best matching procedures for `query`. All terms must match;
+    if nothing does, fall back to matching any term (still BM25-ranked).
+    """
+    tokens = _TOKEN_RE.findall(_normalize(query))
+    if not tokens:
+        return []
+    terms = [_fold(t) for t in tokens if len(t) > 2] or [_fold(t) for t in tokens]
+    weights = ", ".join(str(w) for _, w in _COLUMNS)
+    sql = (
+        f"SELECT rowid, code, type_ent, procedure, bm25(procedures, {weights}) AS score "
+        "FROM procedures WHERE procedures MATCH ? ORDER BY score LIMIT ?"
+    )
+    rows = []
+    for operator in (" AND ", " OR "):
+        expression = operator.join(f'"{t}"' for t in tokens)
+        with _lock:
+            rows = _conn.execute(sql, (expression, limit)).fetchall()
+        if rows:
+            break
+    return [
+        {
+            "code": code,
+            "type_ent": type_ent,
+            "procedure": procedure,
+            "score": round(-score, 4),
+            "documents": _matching_documents(rowid, terms),
+        }
+        for rowid, code, type_ent, procedure, score in rows
+    ]
+
+
+register_reload_hook(load_index)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print('Usage: python -m app.services.search_service "<requête>" [limit]')
+        sys.exit(1)
+    started = time.perf_counter()
+    hits = search(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 10)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    for hit in hits:
+        print(f"{hit['score']:8.3f}  {hit['code']:<12} {hit['type_ent']} — {hit['procedure']}")
+        for line in hit["documents"]:
+            print(f"          • {line}")
+    print(f"\n{len(hits)} résultat(s) en {elapsed_ms:.3f} ms")
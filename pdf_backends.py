@@ -0,0 +1,187 @@
+"""
+Pluggable text-extraction backends for the forms/ PDFs.
+
+Every backend takes a PDF path and returns a list of text chunks (one per page,
+except PyPDFLoader's load_and_split chunks, kept as the historical reference). A small
+per-language policy file (written by the benchmark) says which backend to use;
+extracted text is cached by file hash so re-runs skip parsing entirely.
+
+    python pdf_backends.py benchmark [forms] [--min-fidelity 0.95]
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+import unicodedata
+from collections import Counter
+
+FORMS_FOLDER = "forms"
+# One policy per forms folder: <folder>/pdf_backend_policy.json
+POLICY_NAME = "pdf_backend_policy.json"
+CACHE_FOLDER = os.path.join(FORMS_FOLDER, ".text_cache")
+
+# Backend each language has historically been parsed with (preprocess_pdf_forms
+# used PyPDFLoader for both); it is the fidelity reference in the benchmark
+# and the fallback when no policy file exists.
+REFERENCE_BACKENDS = {"Fr": "langchain_pypdf", "Ar": "langchain_pypdf"}
+
+
+# Backends ---------------------------------------------------------------------
+def _langchain_pypdf(file_path):
+    from langchain_community.document_loaders import PyPDFLoader
+    loader = PyPDFLoader(file_path)
+    return [page.page_content for page in loader.load_and_split()]
+
+def _pypdf(file_path):
+    from pypdf import PdfReader
+    return [page.extract_text() or "" for page in PdfReader(file_path).pages]
+
+def _pypdfium2(file_path):
+    import pypdfium2 as pdfium
+    pdf = pdfium.PdfDocument(file_path)
+    try:
+        return [pdf[i].get_textpage().get_text_range() for i in range(len(pdf))]
+    finally:
+        pdf.close()
+
+def _pdfminer(file_path):
+    from pdfminer.high_level import extract_text as pdfminer_extract_text
+    # pdfminer separates pages with form feeds (and usually ends with one)
+    return pdfminer_extract_text(file_path).rstrip("\f").split("\f")
+
+def _pdfplumber(file_path):
+    import pdfplumber
+    with pdfplumber.open(file_path) as pdf:
+        return [page.extract_text() or "" for page in pdf.pages]
+
+BACKENDS = {
+    "langchain_pypdf": _langchain_pypdf,
+    "pypdf": _pypdf,
+    "pypdfium2": _pypdfium2,
+    "pdfminer": _pdfminer,
+    "pdfplumber": _pdfplumber,
+}
+
+
+# Extraction with policy + cache -----------------------------------------------
+def load_policy(forms_folder=FORMS_FOLDER):
+    path = os.path.join(forms_folder, POLICY_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+_POLICIES = {}  # forms folder → policy
+
+def backend_for(language, forms_folder=FORMS_FOLDER):
+    folder = os.path.abspath(forms_folder)
+    if folder not in _POLICIES:
+        _POLICIES[folder] = load_policy(folder)
+    chosen = _POLICIES[folder].get(language, {}).get("backend")
+    return chosen if chosen in BACKENDS else REFERENCE_BACKENDS.get(language, "pypdf")
+
+def file_hash(file_path):
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def extract_text(file_path, language="Fr", backend=None):
+    """
+    Return the PDF text, joined page by page, using the cache when possible.
+    The backend comes from the policy of the folder the PDF is in.
+    """
+    backend = backend or backend_for(language, os.path.dirname(file_path) or ".")
+    cache_path = os.path.join(CACHE_FOLDER, f"{file_hash(file_path)}.{backend}.txt")
+    if os.path.exists(cache_path):
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    full_text = "\n".join(BACKENDS[backend](file_path))
+    os.makedirs(CACHE_FOLDER, exist_ok=True)
+    with open(cache_path, "w", encoding="utf-8") as f:
+        f.write(full_text)
+    return full_text
+
+
+# Benchmark --------------------------------------------------------------------
+def _tokens(text):
+    return Counter(re.findall(r"\w+", unicodedata.normalize("NFKC", text).lower()))
+
+def fidelity(text, reference):
+    """Token-multiset F1 of `text` against the reference backend's output."""
+    got, ref = _tokens(text), _tokens(reference)
+    if not got and not ref:
+        return 1.0
+    overlap = sum((got & ref).values())
+    if overlap == 0:
+        return 0.0
+    precision = overlap / sum(got.values())
+    recall = overlap / sum(ref.values())
+    return 2 * precision * recall / (precision + recall)
+
+def _page_count(file_path):
+    from pypdf import PdfReader
+    return len(PdfReader(file_path).pages)
+
+def benchmark(forms_folder=FORMS_FOLDER, min_fidelity=0.95):
+    """
+    Parse every <name>Fr.pdf / <name>Ar.pdf with every backend, print pages/sec
+    and mean fidelity per language, and write the fastest backend that meets
+    `min_fidelity` to that folder's policy file (used for the PDFs in it).
+    """
+    policy = {}
+    for language, reference in REFERENCE_BACKENDS.items():
+        files = sorted(
+            os.path.join(forms_folder, f) for f in os.listdir(forms_folder)
+            if f.endswith(f"{language}.pdf")
+        )
+        if not files:
+            continue
+        pages = sum(_page_count(p) for p in files)
+        print(f"\n📊 {language}: {len(files)} fichiers, {pages} pages (référence : {reference})")
+        print(f"  {'backend':<16} {'pages/s':>9} {'fidélité':>9} {'erreurs':>8}")
+
+        reference_texts = {p: "\n".join(BACKENDS[reference](p)) for p in files}
+        results = {}
+        for name, backend in BACKENDS.items():
+            scores, errors = [], 0
+            started = time.perf_counter()
+            for p in files:
+                try:
+                    text = "\n".join(backend(p))
+                except Exception:
+                    errors += 1
+                    scores.append(0.0)
+                    continue
+                scores.append(fidelity(text, reference_texts[p]))
+            elapsed = time.perf_counter() - started
+            results[name] = {
+                "pages_per_sec": round(pages / elapsed, 2) if elapsed else float("inf"),
+                "fidelity": round(sum(scores) / len(scores), 4),
+                "errors": errors,
+            }
+            r = results[name]
+            print(f"  {name:<16} {r['pages_per_sec']:>9} {r['fidelity']:>9} {errors:>8}")
+
+        eligible = [n for n, r in results.items() if r["fidelity"] >= min_fidelity and not r["errors"]]
+        best = max(eligible or [reference], key=lambda n: results[n]["pages_per_sec"])
+        policy[language] = dict(results[best], backend=best, min_fidelity=min_fidelity)
+        print(f"  ✅ Choix pour {language} : {best}")
+
+    with open(os.path.join(forms_folder, POLICY_NAME), "w", encoding="utf-8") as f:
+        json.dump(policy, f, indent=2, ensure_ascii=False)
+    _POLICIES.pop(os.path.abspath(forms_folder), None)
+    return policy
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark PDF text-extraction backends")
+    parser.add_argument("command", choices=["benchmark"])
+    parser.add_argument("forms", nargs="?", default=FORMS_FOLDER)
+    parser.add_argument("--min-fidelity", type=float, default=0.95)
+    args = parser.parse_args()
+    benchmark(args.forms, args.min_fidelity)